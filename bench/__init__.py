@@ -0,0 +1,2 @@
+# bench/__init__.py
+# benchmarks – run as modules from the repo root, e.g. `python -m bench.tick`
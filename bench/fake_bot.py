@@ -0,0 +1,66 @@
+# bench/fake_bot.py
+import asyncio
+import random
+from typing import Optional
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramServerError
+from aiogram.methods import SendMessage
+
+
+class FakeBot:
+    """
+    Stand-in for aiogram.Bot that never touches the network.
+
+    latency:      seconds every API call takes (plus up to `jitter`)
+    error_rate:   share of send_message calls that fail with a 5xx
+    blocked_rate: share of send_message calls that fail with 403 (bot blocked)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        blocked_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.blocked_rate = blocked_rate
+        self.random = random.Random(seed)
+        self.id = 0
+
+        self.sent = 0
+        self.errors = 0
+        self.blocked = 0
+
+    async def _delay(self) -> None:
+        delay = self.latency
+        if self.jitter:
+            delay += self.random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        else:
+            # still yield, like a real request would
+            await asyncio.sleep(0)
+
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        await self._delay()
+        method = SendMessage(chat_id=chat_id, text=text)
+
+        roll = self.random.random()
+        if roll < self.blocked_rate:
+            self.blocked += 1
+            raise TelegramForbiddenError(method, "Forbidden: bot was blocked by the user")
+        if roll < self.blocked_rate + self.error_rate:
+            self.errors += 1
+            raise TelegramServerError(method, "Internal Server Error (injected)")
+
+        self.sent += 1
+        return method
+
+    def reset(self) -> None:
+        self.sent = 0
+        self.errors = 0
+        self.blocked = 0
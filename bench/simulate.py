@@ -0,0 +1,471 @@
+# bench/simulate.py
+"""
+Deterministic schedule simulation on a virtual clock.
+
+Seeds reminders, then walks virtual time minute by minute through the
+real check_reminders_job / reminder_taken / reminder_snooze code with a
+FakeBot. Users answer each reminder at random (take / snooze / ignore),
+the process can be "restarted" on a schedule (cold, or warm as with a
+shutdown snapshot) and DST changes happen as they do in the chosen
+timezone. At the end every expected delivery is
+matched against what was actually sent:
+
+    python -m bench.simulate --days 7 --start 2026-03-26 --tz Europe/Kyiv
+    python -m bench.simulate --reminders 5000 --restart-every 720 --out sim.json
+    python -m bench.simulate --restart-every 720 --restart-downtime 5 --warm-restart
+"""
+import argparse
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import clock
+from config import settings
+from db import get_connection, init_db
+import handlers.reminders as reminders
+from journal import history_journal
+from logging_setup import setup_logging, stop_logging
+from tenancy import DEFAULT_TENANT
+from bench.fake_bot import FakeBot
+from bench.tick import DISTRIBUTIONS, _time_offsets
+
+UTC = timezone.utc
+SNOOZE_MARK = "(повторне нагадування)"
+EXAMPLES = 10
+
+
+class VirtualScheduler:
+    """Just enough of AsyncIOScheduler for reminder_snooze: one-off "date" jobs."""
+
+    def __init__(self, sim: "Simulation"):
+        self.sim = sim
+        self.jobs = {}
+        self._ids = itertools.count()
+
+    def add_job(self, func, trigger="date", run_date=None, args=(), **kwargs):
+        job = SimpleNamespace(id=next(self._ids), func=func, args=args, next_run_time=run_date)
+        self.jobs[job.id] = job
+        self.sim.push(run_date, "job", (self.sim.generation, job))
+
+    def get_jobs(self):
+        return list(self.jobs.values())
+
+
+class RecordingBot(FakeBot):
+    def __init__(self, sim: "Simulation", **kwargs):
+        super().__init__(**kwargs)
+        self.sim = sim
+
+    async def send_message(self, chat_id: int, text: str, reply_markup=None, **kwargs):
+        result = await super().send_message(chat_id, text, reply_markup=reply_markup, **kwargs)
+        self.sim.on_send(chat_id, text, reply_markup)
+        return result
+
+
+class _FakeMessage:
+    def __init__(self, sim: "Simulation"):
+        self.sim = sim
+        self.message_id = 0
+
+    async def edit_reply_markup(self, reply_markup=None):
+        self.sim.api_calls += 1
+
+
+class _FakeCallback:
+    def __init__(self, sim: "Simulation", data: str, user_id: int):
+        self.sim = sim
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = _FakeMessage(sim)
+
+    async def answer(self, text=None, **kwargs):
+        self.sim.api_calls += 1
+
+
+class Simulation:
+    def __init__(self, args):
+        self.args = args
+        self.tz = ZoneInfo(args.tz)
+        self.rng = random.Random(args.seed)
+
+        start_local = datetime.combine(args.start, datetime.min.time(), self.tz)
+        self.start = start_local.astimezone(UTC)
+        self.end = (start_local + timedelta(days=args.days)).astimezone(UTC)
+
+        self.events = []
+        self.seq = itertools.count()
+        # bumped on every restart; jobs from an older generation were held
+        # in the scheduler's memory store and are gone
+        self.generation = 0
+        self.down_until = None
+        self.downtimes = []
+        self.restarts = []
+
+        self.bot = RecordingBot(self, seed=args.seed)
+        self.deliveries = []  # (at_utc, reminder_id, snoozed)
+        self.snoozes = defaultdict(list)  # reminder_id -> [(pressed_at, due_at)]
+        self.ticks = 0
+        self.api_calls = 0
+        self.presses = 0
+        self.repeated_presses = 0
+
+    # ---------- event queue ----------
+
+    def push(self, at: datetime, kind: str, payload=None) -> None:
+        heapq.heappush(self.events, (at.astimezone(UTC), next(self.seq), kind, payload))
+
+    def is_down(self, at: datetime) -> bool:
+        return self.down_until is not None and at < self.down_until
+
+    # ---------- seeding ----------
+
+    def seed(self) -> list:
+        args = self.args
+        base = args.rush_at.hour * 60 + args.rush_at.minute
+        rows = []
+        for offset in _time_offsets(self.rng, args.reminders, args.distribution):
+            minute = (base + offset) % 1440
+            if self.rng.random() < args.daily_fraction:
+                days = "daily"
+            else:
+                days = ",".join(
+                    str(d) for d in sorted(self.rng.sample(range(7), self.rng.randint(1, 6)))
+                )
+            rows.append((
+                self.rng.randrange(args.users),
+                f"pill-{self.rng.randrange(1000)}",
+                f"{minute // 60:02d}:{minute % 60:02d}",
+                days,
+            ))
+
+        conn = get_connection()
+        conn.executemany(
+            "INSERT INTO reminders (user_id, pill_name, time_str, days, last_sent_date) "
+            "VALUES (?, ?, ?, ?, NULL)",
+            rows,
+        )
+        conn.commit()
+        seeded = conn.execute("SELECT id, user_id, time_str, days FROM reminders").fetchall()
+        conn.close()
+        return seeded
+
+    # ---------- bot side ----------
+
+    def on_send(self, chat_id: int, text: str, reply_markup) -> None:
+        at = clock.now(UTC)
+        taken_data = reply_markup.inline_keyboard[0][0].callback_data
+        snooze_data = reply_markup.inline_keyboard[0][1].callback_data
+        reminder_id = int(taken_data.split(":")[1])
+        self.deliveries.append((at, reminder_id, SNOOZE_MARK in text))
+
+        # the user reacts some time later – or never
+        roll = self.rng.random()
+        delay = timedelta(seconds=self.rng.uniform(5, self.args.max_response * 60))
+        if roll < self.args.taken_rate:
+            data = taken_data
+        elif roll < self.args.taken_rate + self.args.snooze_rate:
+            data = snooze_data
+        else:
+            return
+        self.push(at + delay, "press", (data, chat_id, False))
+        if self.rng.random() < self.args.repeat_rate:
+            # double tap or a redelivered update
+            repeat_delay = timedelta(seconds=self.rng.uniform(0.2, 5))
+            self.push(at + delay + repeat_delay, "press", (data, chat_id, True))
+
+    async def handle(self, at: datetime, kind: str, payload) -> None:
+        if kind == "tick":
+            self.push(at + timedelta(minutes=1), "tick")
+            if not self.is_down(at):
+                self.ticks += 1
+                await reminders.check_reminders_job({DEFAULT_TENANT: self.bot})
+
+        elif kind == "job":
+            generation, job = payload
+            if generation == self.generation:
+                reminders.scheduler.jobs.pop(job.id, None)
+                await job.func(*job.args)
+
+        elif kind == "press":
+            if self.is_down(at):
+                # Telegram keeps the update until polling resumes
+                self.push(self.down_until + timedelta(seconds=1), kind, payload)
+                return
+            data, user_id, repeated = payload
+            self.presses += 1
+            self.repeated_presses += repeated
+            callback = _FakeCallback(self, data, user_id)
+            if data.startswith("taken:"):
+                await reminders.reminder_taken(callback)
+            else:
+                parts = data.split(":")
+                reminder_id, minutes = int(parts[1]), int(parts[2])
+                await reminders.reminder_snooze(callback, self.bot)
+                if not repeated:
+                    self.snoozes[reminder_id].append((at, at + timedelta(minutes=minutes)))
+
+        elif kind == "restart":
+            # what save_snapshot() would hand over on a graceful shutdown
+            handover = (reminders.pending_snoozes(), reminders.last_tick)
+            # the next process starts without the old one's last tick
+            reminders.last_tick = None
+            self.generation += 1
+            reminders.scheduler.jobs.clear()
+            self.down_until = at + timedelta(minutes=self.args.restart_downtime)
+            self.downtimes.append((at, self.down_until))
+            self.restarts.append(at)
+            self.push(at + timedelta(minutes=self.args.restart_every), "restart")
+            if self.args.warm_restart:
+                self.push(self.down_until, "resume", handover)
+
+        elif kind == "resume":
+            snoozes, last_tick = payload
+            bots = {DEFAULT_TENANT: self.bot}
+            reminders.restore_snoozes(bots, snoozes, self.args.catchup_minutes)
+            if last_tick is not None:
+                await reminders.catch_up(bots, last_tick, self.args.catchup_minutes)
+
+    async def run(self) -> None:
+        first_tick = self.start + timedelta(seconds=self.args.tick_offset)
+        self.push(first_tick, "tick")
+        if self.args.restart_every:
+            self.push(self.start + timedelta(minutes=self.args.restart_every), "restart")
+
+        while self.events and self.events[0][0] < self.end:
+            at, _, kind, payload = heapq.heappop(self.events)
+            clock.get_clock().set(at)
+            await self.handle(at, kind, payload)
+
+    # ---------- analysis ----------
+
+    def expected_scheduled(self, seeded):
+        """(reminder_id, local_date) -> (expected_at_utc, in_dst_gap)"""
+        expected = {}
+        for row in seeded:
+            hh, mm = map(int, row["time_str"].split(":"))
+            days = None if row["days"] == "daily" else {int(d) for d in row["days"].split(",")}
+            for n in range(self.args.days):
+                day = self.args.start + timedelta(days=n)
+                if days is not None and day.weekday() not in days:
+                    continue
+                local = datetime(day.year, day.month, day.day, hh, mm, tzinfo=self.tz)
+                at = local.astimezone(UTC)
+                if not self.start <= at < self.end - timedelta(minutes=1):
+                    continue
+                # wall time that doesn't exist (clocks jumped over it)
+                gap = at.astimezone(self.tz).replace(tzinfo=None) != local.replace(tzinfo=None)
+                expected[(row["id"], day)] = (at, gap)
+        return expected
+
+    def _in_downtime(self, at: datetime) -> bool:
+        return any(start <= at < end for start, end in self.downtimes)
+
+    def report_scheduled(self, seeded) -> dict:
+        expected = self.expected_scheduled(seeded)
+        delivered = defaultdict(list)
+        for at, reminder_id, snoozed in self.deliveries:
+            if not snoozed:
+                delivered[(reminder_id, at.astimezone(self.tz).date())].append(at)
+
+        late_after = timedelta(seconds=self.args.late_after)
+        missed, late, duplicated = [], [], []
+        reasons = defaultdict(int)
+        for key, (at, gap) in expected.items():
+            sends = delivered.get(key, [])
+            if not sends:
+                reason = "dst_gap" if gap else "downtime" if self._in_downtime(at) else "other"
+                reasons[reason] += 1
+                missed.append({"id": key[0], "date": key[1], "expected": at, "reason": reason})
+                continue
+            if len(sends) > 1:
+                duplicated.append({"id": key[0], "date": key[1], "sent": sends})
+            if sends[0] - at > late_after:
+                late.append({"id": key[0], "date": key[1], "expected": at, "sent": sends[0]})
+
+        unexpected = [
+            {"id": key[0], "date": key[1], "sent": sends}
+            for key, sends in delivered.items() if key not in expected
+        ]
+        return {
+            "expected": len(expected),
+            "delivered": sum(len(s) for s in delivered.values()),
+            "missed": len(missed),
+            "missed_by_reason": dict(reasons),
+            "duplicated": len(duplicated),
+            "late": len(late),
+            "unexpected": len(unexpected),
+            "examples": {
+                "missed": missed[:EXAMPLES],
+                "duplicated": duplicated[:EXAMPLES],
+                "late": late[:EXAMPLES],
+                "unexpected": unexpected[:EXAMPLES],
+            },
+        }
+
+    def report_snoozed(self) -> dict:
+        delivered = defaultdict(list)
+        for at, reminder_id, snoozed in self.deliveries:
+            if snoozed:
+                delivered[reminder_id].append(at)
+
+        late_after = timedelta(seconds=self.args.late_after)
+        expected_count = missed_count = late_count = 0
+        missed, late, duplicated = [], [], []
+        reasons = defaultdict(int)
+        for reminder_id, snoozes in self.snoozes.items():
+            sends = sorted(delivered.get(reminder_id, []))
+            snoozes = sorted(snoozes)
+            for i, (pressed_at, due_at) in enumerate(snoozes):
+                if due_at >= self.end:
+                    continue
+                expected_count += 1
+                # on time first; otherwise the first send before the next snooze is due
+                window_end = snoozes[i + 1][1] if i + 1 < len(snoozes) else self.end
+                match = next(
+                    (s for s in sends if due_at - timedelta(seconds=1) <= s <= due_at + late_after),
+                    None,
+                ) or next(
+                    (s for s in sends if due_at - timedelta(seconds=1) <= s < window_end),
+                    None,
+                )
+                if match is None:
+                    restarted = any(pressed_at <= r < due_at for r in self.restarts)
+                    reason = "restart" if restarted else "other"
+                    reasons[reason] += 1
+                    missed_count += 1
+                    missed.append({"id": reminder_id, "expected": due_at, "reason": reason})
+                    continue
+                sends.remove(match)
+                if match - due_at > late_after:
+                    late_count += 1
+                    late.append({"id": reminder_id, "expected": due_at, "sent": match})
+            duplicated.extend({"id": reminder_id, "sent": s} for s in sends)
+
+        return {
+            "expected": expected_count,
+            "delivered": sum(len(s) for s in delivered.values()),
+            "missed": missed_count,
+            "missed_by_reason": dict(reasons),
+            "duplicated": len(duplicated),
+            "late": late_count,
+            "examples": {
+                "missed": missed[:EXAMPLES],
+                "duplicated": duplicated[:EXAMPLES],
+                "late": late[:EXAMPLES],
+            },
+        }
+
+
+async def main(args) -> int:
+    setup_logging(level=getattr(logging, args.log_level))
+    workdir = tempfile.mkdtemp(prefix="pills-sim-", dir=args.db_dir)
+    settings.db_path = os.path.join(workdir, "sim.db")
+    settings.timezone = args.tz
+    init_db()
+    history_journal.path = os.path.join(workdir, "history.journal")
+    history_journal.open()
+
+    sim = Simulation(args)
+    clock.set_clock(clock.VirtualClock(sim.start, sim.tz))
+    reminders.scheduler = VirtualScheduler(sim)
+
+    seeded = sim.seed()
+    started = time.perf_counter()
+    await sim.run()
+    await history_journal.close()
+    wall = time.perf_counter() - started
+
+    conn = get_connection()
+    actions = dict(conn.execute(
+        "SELECT action, COUNT(*) FROM history WHERE action != 'sent' GROUP BY action"
+    ).fetchall())
+    conn.close()
+
+    result = {
+        "benchmark": "schedule_simulation",
+        "params": vars(args),
+        "wall_s": round(wall, 3),
+        "virtual_days": args.days,
+        "ticks": sim.ticks,
+        "restarts": len(sim.restarts),
+        "api_calls": sim.api_calls + sim.bot.sent,
+        "presses": {"total": sim.presses, "repeated": sim.repeated_presses},
+        # one row per first press; repeats must not add any
+        "history_actions": actions,
+        "scheduled": sim.report_scheduled(seeded),
+        "snoozed": sim.report_snoozed(),
+    }
+    text = json.dumps(result, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    problems = sum(
+        result[kind][field]
+        for kind in ("scheduled", "snoozed")
+        for field in ("duplicated", "late")
+    )
+    return 1 if args.strict and problems else 0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--start", type=date.fromisoformat, default=date(2026, 3, 26),
+                   help="first simulated local date (default spans the EU spring DST change)")
+    p.add_argument("--days", type=int, default=7)
+    p.add_argument("--tz", default="Europe/Kyiv")
+    p.add_argument("--reminders", type=int, default=2_000)
+    p.add_argument("--users", type=int, default=500)
+    p.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+    p.add_argument("--rush-at", type=lambda s: datetime.strptime(s, "%H:%M").time(),
+                   default="08:00", help="centre of the rush distribution")
+    p.add_argument("--daily-fraction", type=float, default=0.8)
+    p.add_argument("--taken-rate", type=float, default=0.7)
+    p.add_argument("--snooze-rate", type=float, default=0.2)
+    p.add_argument("--repeat-rate", type=float, default=0.0,
+                   help="fraction of presses that arrive twice (double tap, redelivery)")
+    p.add_argument("--max-response", type=float, default=30.0,
+                   help="minutes a user may take to press a button")
+    p.add_argument("--tick-offset", type=float, default=5.0,
+                   help="seconds past the minute the tick fires")
+    p.add_argument("--late-after", type=float, default=90.0,
+                   help="seconds after the expected time a delivery counts as late")
+    p.add_argument("--restart-every", type=float, default=0.0,
+                   help="restart the process every N virtual minutes (0 = never)")
+    p.add_argument("--restart-downtime", type=float, default=1.0,
+                   help="virtual minutes the bot is down on each restart")
+    p.add_argument("--warm-restart", action="store_true",
+                   help="restarts hand pending snoozes and the last tick to the next "
+                   "process, as the shutdown snapshot does")
+    p.add_argument("--catchup-minutes", type=int, default=15,
+                   help="with --warm-restart: how far back missed ticks are replayed")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--db-dir", help="where to put the throwaway database; commits "
+                   "dominate the run time, so a tmpfs like /dev/shm helps a lot")
+    p.add_argument("--strict", action="store_true",
+                   help="exit non-zero on duplicated or late deliveries")
+    p.add_argument("--out", help="write JSON results here instead of stdout")
+    p.add_argument("--log-level", default="ERROR",
+                   choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        code = asyncio.run(main(parse_args()))
+    finally:
+        stop_logging()
+    sys.exit(code)
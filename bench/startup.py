@@ -0,0 +1,160 @@
+# bench/startup.py
+"""
+Start-up time benchmark. Every scenario runs in a fresh interpreter, so
+nothing is cached between samples:
+
+    python -m bench.startup
+    python -m bench.startup --repeat 10 --out startup.json
+    python -m bench.startup --baseline startup.json
+    python -m bench.startup --importtime bot     # slowest imports of one target
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> code measured inside the child process
+SCENARIOS = {
+    "import config": "import config",
+    "import strings": "import strings",
+    "import db": "import db",
+    "import transfer": "import transfer",
+    "import handlers.reminders": "import handlers.reminders",
+    "import bot": "import bot",
+    "bootstrap": (
+        "from bootstrap import bootstrap\n"
+        "bootstrap(require_token=False, open_journal=False)"
+    ),
+    "transfer export": (
+        "import transfer\n"
+        "transfer.main(['export', 'reminders', '-o', os.devnull])"
+    ),
+}
+
+CHILD = """
+import os, sys, time
+started = time.perf_counter()
+{code}
+sys.stdout.write(repr(time.perf_counter() - started))
+"""
+
+
+def run_child(code: str, env: dict) -> tuple:
+    """Returns (in-process seconds, whole process wall seconds)."""
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(code=code)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - started
+    return float(out.stdout.strip().splitlines()[-1]), wall
+
+
+def importtime(target: str, env: dict, top: int) -> list:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self_us | cumulative_us | module"
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": n, "cumulative_ms": c / 1000, "self_ms": s / 1000} for c, s, n in rows[:top]]
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list:
+    lines = []
+    for name, new in summary.items():
+        old = baseline.get(name)
+        if not old or not old["median_s"]:
+            continue
+        ratio = new["median_s"] / old["median_s"]
+        mark = "!" if ratio > 1 + tolerance else " "
+        lines.append(f"{mark} {name}: {old['median_s']} -> {new['median_s']} ({ratio:.2f}x)")
+    return lines
+
+
+def main(args) -> int:
+    workdir = tempfile.mkdtemp(prefix="pills-startup-")
+    env = dict(os.environ)
+    env.update({
+        "DB_PATH": os.path.join(workdir, "startup.db"),
+        "JOURNAL_PATH": os.path.join(workdir, "history.journal"),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    })
+
+    if args.importtime:
+        print(json.dumps(importtime(args.importtime, env, args.top), indent=2))
+        return 0
+
+    # warm the OS file cache and .pyc files once, then measure
+    run_child("import bot", env)
+
+    summary = {}
+    for name, code in SCENARIOS.items():
+        inner, wall = [], []
+        for _ in range(args.repeat):
+            i, w = run_child(code, env)
+            inner.append(i)
+            wall.append(w)
+        summary[name] = {
+            "median_s": round(statistics.median(inner), 4),
+            "min_s": round(min(inner), 4),
+            "process_median_s": round(statistics.median(wall), 4),
+        }
+
+    result = {
+        "benchmark": "startup",
+        "python": sys.version.split()[0],
+        "params": vars(args),
+        "summary": summary,
+    }
+    text = json.dumps(result, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+        lines = compare(summary, baseline, args.tolerance)
+        print("\n".join(lines), file=sys.stderr)
+        if any(line.startswith("!") for line in lines):
+            return 1
+    return 0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--out", help="write JSON results here instead of stdout")
+    p.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    p.add_argument("--tolerance", type=float, default=0.2)
+    p.add_argument("--importtime", metavar="MODULE",
+                   help="print the slowest imports (python -X importtime) of MODULE instead")
+    p.add_argument("--top", type=int, default=15)
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,262 @@
+# bench/tick.py
+"""
+Synthetic load benchmark for check_reminders_job.
+
+Seeds a throwaway SQLite database, runs the tick against FakeBot and
+prints machine-readable results:
+
+    python -m bench.tick --reminders 50000 --distribution rush --latency 0.002
+    python -m bench.tick --out baseline.json
+    python -m bench.tick --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import clock
+from config import settings
+from db import get_connection, init_db
+import handlers.reminders as reminders
+from logging_setup import setup_logging, stop_logging
+from tenancy import DEFAULT_TENANT
+from bench.fake_bot import FakeBot
+
+DISTRIBUTIONS = ("spike", "uniform", "rush")
+
+# metric -> True when bigger is better
+METRICS = {
+    "tick_wall_s": False,
+    "db_s": False,
+    "sends_per_s": True,
+    "peak_mem_kb": False,
+}
+
+
+class DbTimer:
+    """Wraps the db helpers used by the tick and sums the time spent in them."""
+
+    def __init__(self):
+        self.total = 0.0
+        self.calls = 0
+
+    def reset(self) -> None:
+        self.total = 0.0
+        self.calls = 0
+
+    def wrap(self, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.total += time.perf_counter() - started
+                self.calls += 1
+        return timed
+
+    def install(self, module) -> None:
+        for name in dir(module):
+            obj = getattr(module, name)
+            if callable(obj) and getattr(obj, "__module__", None) == "db":
+                setattr(module, name, self.wrap(obj))
+
+
+def _time_offsets(rng: random.Random, count: int, distribution: str):
+    """Minute offsets from the ticked minute, one per reminder."""
+    if distribution == "spike":
+        return [0] * count
+    if distribution == "uniform":
+        return [rng.randrange(-720, 720) for _ in range(count)]
+    # rush: bell curve around the ticked minute, like 08:00 on a weekday
+    return [max(-720, min(719, round(rng.gauss(0, 20)))) for _ in range(count)]
+
+
+def seed(args, tick_at: datetime) -> int:
+    """Fill an empty reminders table. Returns how many rows are due at tick_at."""
+    rng = random.Random(args.seed)
+    today_str = tick_at.date().isoformat()
+    weekday = tick_at.weekday()
+
+    rows = []
+    due = 0
+    for offset in _time_offsets(rng, args.reminders, args.distribution):
+        at = tick_at + timedelta(minutes=offset)
+        if rng.random() < args.daily_fraction:
+            days = "daily"
+        else:
+            days = ",".join(str(d) for d in sorted(rng.sample(range(7), rng.randint(1, 6))))
+        last_sent = today_str if rng.random() < args.sent_fraction else None
+
+        if offset == 0 and last_sent is None and (
+            days == "daily" or str(weekday) in days.split(",")
+        ):
+            due += 1
+
+        rows.append((
+            rng.randrange(args.users),
+            f"pill-{rng.randrange(1000)}",
+            at.strftime("%H:%M"),
+            days,
+            last_sent,
+        ))
+
+    conn = get_connection()
+    conn.execute("DELETE FROM history")
+    conn.execute("DELETE FROM reminders")
+    conn.executemany(
+        "INSERT INTO reminders (user_id, pill_name, time_str, days, last_sent_date) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+    conn.close()
+    return due
+
+
+async def run_once(args, bot: FakeBot, timer: DbTimer, trace_memory: bool = False) -> dict:
+    tick_at = datetime.now(reminders.local_tz()).replace(second=0, microsecond=0)
+    # pin the tick to the seeded minute, however long seeding takes
+    clock.set_clock(clock.VirtualClock(tick_at + timedelta(seconds=1), reminders.local_tz()))
+    due = seed(args, tick_at)
+
+    bot.reset()
+    timer.reset()
+    if trace_memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    await reminders.check_reminders_job({DEFAULT_TENANT: bot})
+    wall = time.perf_counter() - started
+
+    peak_kb = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kb = round(peak / 1024, 1)
+
+    return {
+        "due": due,
+        "sends": bot.sent,
+        "errors": bot.errors,
+        "blocked": bot.blocked,
+        "tick_wall_s": round(wall, 4),
+        "db_s": round(timer.total, 4),
+        "db_calls": timer.calls,
+        "sends_per_s": round(bot.sent / wall, 1) if wall else None,
+        "peak_mem_kb": peak_kb,
+    }
+
+
+def summarize(runs) -> dict:
+    summary = {}
+    for metric in METRICS:
+        values = [r[metric] for r in runs if r[metric] is not None]
+        if values:
+            summary[metric] = {
+                "median": round(statistics.median(values), 4),
+                "min": min(values),
+                "max": max(values),
+            }
+    return summary
+
+
+def compare(summary: dict, baseline: dict, tolerance: float) -> list:
+    """Returns a line per metric; lines starting with '!' are regressions."""
+    lines = []
+    for metric, higher_is_better in METRICS.items():
+        if metric not in summary or metric not in baseline:
+            continue
+        new = summary[metric]["median"]
+        old = baseline[metric]["median"]
+        if not old:
+            continue
+        ratio = new / old
+        worse = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+        lines.append(f"{'!' if worse else ' '} {metric}: {old} -> {new} ({ratio:.2f}x)")
+    return lines
+
+
+async def main(args) -> int:
+    setup_logging(level=getattr(logging, args.log_level))
+    workdir = tempfile.mkdtemp(prefix="pills-bench-")
+    settings.db_path = os.path.join(workdir, "bench.db")
+    init_db()
+
+    bot = FakeBot(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        blocked_rate=args.blocked_rate,
+        seed=args.seed,
+    )
+    timer = DbTimer()
+    timer.install(reminders)
+
+    runs = [await run_once(args, bot, timer) for _ in range(args.repeat)]
+    # tracemalloc slows everything down, so memory gets its own run
+    memory_run = await run_once(args, bot, timer, trace_memory=True)
+    for r in runs:
+        r["peak_mem_kb"] = memory_run["peak_mem_kb"]
+
+    result = {
+        "benchmark": "check_reminders_job",
+        "params": vars(args),
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+
+    text = json.dumps(result, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+        lines = compare(result["summary"], baseline, args.tolerance)
+        print("\n".join(lines), file=sys.stderr)
+        if any(line.startswith("!") for line in lines):
+            return 1
+    return 0
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--reminders", type=int, default=10_000)
+    p.add_argument("--users", type=int, default=2_000)
+    p.add_argument("--distribution", choices=DISTRIBUTIONS, default="rush")
+    p.add_argument("--daily-fraction", type=float, default=0.8)
+    p.add_argument("--sent-fraction", type=float, default=0.0,
+                   help="share of reminders already sent today")
+    p.add_argument("--latency", type=float, default=0.0, help="seconds per API call")
+    p.add_argument("--jitter", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument("--blocked-rate", type=float, default=0.0)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="write JSON results here instead of stdout")
+    p.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    p.add_argument("--tolerance", type=float, default=0.2)
+    p.add_argument("--log-level", default="ERROR",
+                   choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        code = asyncio.run(main(parse_args()))
+    finally:
+        stop_logging()
+    sys.exit(code)
@@ -0,0 +1,40 @@
+# bootstrap.py
+"""
+Explicit application start-up.
+
+Importing a module no longer reads .env, strings.json or the database;
+the bot process calls bootstrap() once, tools and workers only pay for
+what they actually touch.
+"""
+import logging
+
+from config import settings
+from db import init_db, reminders_cache
+import dedupe
+from journal import history_journal
+from logging_setup import setup_logging
+from tenancy import load_tenants
+
+
+def bootstrap(require_token: bool = True, open_journal: bool = True):
+    if require_token:
+        # BOT_TOKEN, or every bot listed in TENANTS_FILE
+        load_tenants()
+
+    setup_logging(level=logging.DEBUG if settings.debug else logging.INFO)
+
+    reminders_cache.maxsize = settings.cache_size
+    reminders_cache.ttl = settings.cache_ttl
+
+    for cache in (dedupe.handled, dedupe.latest):
+        cache.maxsize = settings.dedupe_size
+        cache.ttl = settings.dedupe_ttl
+
+    history_journal.flush_interval = settings.journal_flush_interval
+    history_journal.max_batch = settings.journal_max_batch
+    history_journal.fsync = settings.journal_fsync
+
+    init_db()
+    if open_journal:
+        history_journal.open()
+    return settings
@@ -1,42 +1,124 @@
 # bot.py
 import asyncio
 import logging
+import time
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 
-from config import settings
-from db import init_db
+from bootstrap import bootstrap
+from broadcast import resume_broadcasts, stop_broadcasts
+from db import close_all_connections, run_backfills
+from handlers.admin import register_admin_handlers
 from handlers.common import register_common_handlers
 from handlers.pills import register_pill_handlers
-from handlers.reminders import register_reminder_handlers, setup_scheduler
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+from handlers.reminders import (
+    catch_up,
+    drain,
+    get_scheduler,
+    register_reminder_handlers,
+    setup_scheduler,
 )
+from handlers.transfer import register_transfer_handlers
+from journal import history_journal
+from logging_setup import stop_logging
+from middlewares import PriorityMiddleware, TenantMiddleware
+from snapshot import restore_snapshot, save_snapshot
+from tenancy import tenants
+
+logger = logging.getLogger(__name__)
+
+
+async def shutdown(settings, bots, priority: PriorityMiddleware, background):
+    """
+    Runs once polling has stopped, i.e. no new updates come in: lets
+    running handlers and sends finish (or cancels them at the deadline),
+    flushes the journal and leaves a snapshot for the next process.
+    """
+    deadline = time.monotonic() + settings.shutdown_timeout
+
+    def left() -> float:
+        return max(0.0, deadline - time.monotonic())
+
+    if not await priority.drain(left()):
+        logger.warning("[shutdown] handlers still running at the deadline")
+    # broadcasts continue from their checkpoint after the restart
+    await stop_broadcasts()
+
+    scheduler = get_scheduler()
+    # no new ticks or snoozed sends; pending ones stay in the store
+    scheduler.pause()
+    cancelled = await drain(left())
+    if cancelled:
+        # an unfinished tick is replayed by the next process (catch_up)
+        logger.warning("[shutdown] cancelled %d sends at the deadline", cancelled)
+
+    for task in background:
+        task.cancel()
+    await history_journal.close()
+
+    save_snapshot()
+    scheduler.shutdown(wait=False)
+
+    await asyncio.gather(*(bot.session.close() for bot in bots.values()))
+    close_all_connections()
+
 
 async def main():
-    init_db()
+    settings = bootstrap()
+    background = [
+        asyncio.create_task(history_journal.run()),
+        # data migrations, a small batch at a time (see db.run_backfills)
+        asyncio.create_task(run_backfills()),
+    ]
 
-    bot = Bot(
-        settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
-    )
+    # one Bot per tenant, all polled by the same dispatcher
+    bots = {
+        name: Bot(
+            tenant.bot_token,
+            default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN),
+        )
+        for name, tenant in tenants.items()
+    }
     dp = Dispatcher()
+    dp.update.outer_middleware(TenantMiddleware())
+    priority = PriorityMiddleware(
+        max_in_flight=settings.max_in_flight,
+        per_user=settings.per_user_in_flight,
+        shed_after=settings.shed_after,
+    )
+    dp.update.outer_middleware(priority)
+    # for /stats (handlers.admin)
+    dp["priority"] = priority
 
     # register all handlers
     register_common_handlers(dp)
     register_pill_handlers(dp)
     register_reminder_handlers(dp)
+    register_transfer_handlers(dp)
+    register_admin_handlers(dp)
 
-    # scheduler for reminders
-    await setup_scheduler(bot)
+    # scheduler for reminders, warmed up from the previous process if it
+    # left a snapshot
+    await setup_scheduler(bots)
+    last_tick = restore_snapshot(bots)
+    if last_tick is not None:
+        background.append(
+            asyncio.create_task(catch_up(bots, last_tick, settings.catchup_minutes))
+        )
+    resume_broadcasts(bots)
 
-    print("Bot is running...")
-    await dp.start_polling(bot)
+    print(f"Bot is running ({', '.join(bots)})...")
+    try:
+        # returns on SIGTERM / SIGINT; sessions are closed by shutdown()
+        await dp.start_polling(*bots.values(), close_bot_session=False)
+    finally:
+        await shutdown(settings, bots, priority, background)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main())
+    finally:
+        stop_logging()
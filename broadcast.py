@@ -0,0 +1,141 @@
+# broadcast.py
+"""
+Admin broadcast to every user of a tenant.
+
+Recipients are read from the DB one keyset page at a time and sent
+through a small pool of workers behind the tenant's broadcast token
+bucket – shared by all its broadcasts – so a broadcast never holds more
+than a page in memory and stays well inside Telegram's flood limits. The broadcast waits while a reminder tick is sending –
+reminders always go first.
+
+Progress is checkpointed in the `broadcasts` table after every page;
+after a restart resume_broadcasts() carries on from the checkpoint. A
+crash in the middle of a page re-sends at most that page.
+"""
+import asyncio
+import logging
+from typing import Dict
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+
+from config import settings
+from db import get_broadcast, get_broadcasts, get_recipients_page, save_broadcast_progress
+import handlers.reminders as reminders
+from ratelimit import RateLimiter
+from strings import strings
+from tenancy import current_tenant, get_tenant
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ("delivered", "blocked", "failed")
+MAX_RETRIES = 3
+
+# broadcast id -> task, for shutdown and to avoid running one twice
+running: Dict[int, asyncio.Task] = {}
+
+
+async def _deliver(bot: Bot, user_id: int, text: str,
+                   limiter: RateLimiter, slots: asyncio.Semaphore) -> str:
+    async with slots:
+        while reminders.sending():
+            await asyncio.sleep(0.5)
+
+        for _ in range(MAX_RETRIES):
+            await limiter.acquire()
+            try:
+                # sent as typed: a Markdown slip must not fail every send
+                await bot.send_message(chat_id=user_id, text=text, parse_mode=None)
+                return "delivered"
+            except TelegramRetryAfter as e:
+                # flood control is per bot: every worker holds off, not just this one
+                logger.warning("[broadcast] flood control, waiting %ss", e.retry_after)
+                limiter.pause(e.retry_after)
+            except TelegramForbiddenError:
+                return "blocked"
+            except TelegramAPIError as e:
+                logger.warning(
+                    "[broadcast] send failed",
+                    extra={
+                        "sample_key": "broadcast.failed",
+                        "fields": {"user": user_id, "error": e},
+                    },
+                )
+                return "failed"
+        return "failed"
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int) -> Dict[str, int]:
+    row = get_broadcast(broadcast_id)
+    counts = {k: row[k] for k in OUTCOMES}
+    after = row["last_user_id"]
+
+    limiter = get_tenant(row["tenant"]).broadcast_limiter
+    slots = asyncio.Semaphore(settings.broadcast_concurrency)
+
+    while True:
+        page = get_recipients_page(row["tenant"], after, settings.broadcast_page_size)
+        if not page:
+            break
+        outcomes = await asyncio.gather(
+            *(_deliver(bot, user_id, row["text"], limiter, slots) for user_id in page)
+        )
+        for outcome in outcomes:
+            counts[outcome] += 1
+        after = page[-1]
+        save_broadcast_progress(broadcast_id, after, **counts)
+        logger.info(
+            "[broadcast] page done",
+            extra={"fields": {"id": broadcast_id, "last_user_id": after, **counts}},
+        )
+
+    save_broadcast_progress(broadcast_id, after, **counts, done=True)
+    return counts
+
+
+async def _run_and_report(bot: Bot, broadcast_id: int) -> None:
+    try:
+        counts = await run_broadcast(bot, broadcast_id)
+        row = get_broadcast(broadcast_id)
+        # the report uses that tenant's strings (the task has its own context)
+        current_tenant.set(row["tenant"])
+        await bot.send_message(
+            chat_id=row["created_by"],
+            text=strings.texts["broadcast_done"].format(id=broadcast_id, **counts),
+        )
+    except asyncio.CancelledError:
+        # shutdown – the checkpoint is in the DB, resume_broadcasts() continues
+        logger.info("[broadcast] %d paused", broadcast_id)
+        raise
+    except Exception:
+        logger.exception("[broadcast] %d failed", broadcast_id)
+    finally:
+        running.pop(broadcast_id, None)
+
+
+def start_broadcast(bot: Bot, broadcast_id: int) -> asyncio.Task:
+    task = running.get(broadcast_id)
+    if task is None:
+        task = running[broadcast_id] = asyncio.create_task(_run_and_report(bot, broadcast_id))
+    return task
+
+
+def resume_broadcasts(bots: Dict[str, Bot]) -> int:
+    resumed = 0
+    for row in get_broadcasts(status="running", limit=100):
+        bot = bots.get(row["tenant"])
+        if bot is None:
+            continue
+        start_broadcast(bot, row["id"])
+        resumed += 1
+    if resumed:
+        logger.info("[broadcast] resumed %d unfinished broadcasts", resumed)
+    return resumed
+
+
+async def stop_broadcasts() -> None:
+    tasks = list(running.values())
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        await asyncio.wait(tasks)
@@ -0,0 +1,103 @@
+# cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after `ttl` seconds.
+    Not thread-safe – it lives on the event loop like everything else.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True,
+            valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """`valid`: an entry it rejects is dropped and counts as a miss."""
+        item = self._data.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at > self.timer() and (valid is None or valid(value)):
+                self._data.move_to_end(key)
+                if count:
+                    self.hits += 1
+                return value
+            del self._data[key]
+        if count:
+            self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def add(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """set() only if `key` has no live entry. Returns whether it was added."""
+        if key in self:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        if self._data.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def dump(self) -> List[Tuple[Hashable, Any, float]]:
+        """Live entries as (key, value, seconds left), least recently used first."""
+        now = self.timer()
+        return [
+            (key, value, expires_at - now)
+            for key, (expires_at, value) in self._data.items()
+            if expires_at > now
+        ]
+
+    def load(self, entries) -> int:
+        """Counterpart of dump(); entries already expired are dropped."""
+        loaded = 0
+        for key, value, ttl in entries:
+            if ttl > 0:
+                self.set(key, value, ttl=min(ttl, self.ttl))
+                loaded += 1
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
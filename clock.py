@@ -0,0 +1,58 @@
+# clock.py
+"""
+Single source of "now" for the scheduler and the db helpers.
+
+Production code calls clock.now(tz) instead of datetime.now(tz), so a
+simulation can swap in a VirtualClock and move time by hand.
+"""
+from datetime import date, datetime, timedelta, timezone, tzinfo
+from typing import Optional
+
+
+class SystemClock:
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        return datetime.now(tz)
+
+
+class VirtualClock:
+    """
+    Clock that only moves when advance()/set() is called.
+    Keeps an aware UTC instant; naive now() is returned in `local_tz`.
+    """
+
+    def __init__(self, start: datetime, local_tz: tzinfo = timezone.utc):
+        if start.tzinfo is None:
+            raise ValueError("VirtualClock needs an aware start datetime")
+        self.local_tz = local_tz
+        self._now = start.astimezone(timezone.utc)
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        if tz is None:
+            return self._now.astimezone(self.local_tz).replace(tzinfo=None)
+        return self._now.astimezone(tz)
+
+    def set(self, when: datetime) -> None:
+        self._now = when.astimezone(timezone.utc)
+
+    def advance(self, delta: timedelta) -> None:
+        self._now += delta
+
+
+_clock = SystemClock()
+
+
+def now(tz: Optional[tzinfo] = None) -> datetime:
+    return _clock.now(tz)
+
+
+def today(tz: Optional[tzinfo] = None) -> date:
+    return _clock.now(tz).date()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(new_clock) -> None:
+    global _clock
+    _clock = new_clock
@@ -1,22 +1,108 @@
 # config.py
 import os
 from dataclasses import dataclass
-from dotenv import load_dotenv
+from typing import FrozenSet
 
-load_dotenv()
+from lazy import LazyObject
+
+
+def _flag(name: str) -> bool:
+    return os.getenv(name, "") not in ("", "0", "false")
+
+
+def _ids(name: str) -> FrozenSet[int]:
+    # "123, 456"
+    return frozenset(int(x) for x in os.getenv(name, "").replace(" ", "").split(",") if x)
 
 
 @dataclass
 class Settings:
     bot_token: str
     db_path: str = "pills.db"
+    # seconds a statement waits for another connection's write lock
+    db_busy_timeout: float = 30.0
+    # let the bot build ONLINE_INDEXES itself (see db.run_backfills); off:
+    # `python db.py backfill` in a maintenance window
+    online_index_builds: bool = False
     strings_path: str = "strings.json"
-    timezone: str = os.getenv("TZ", "UTC")
+    timezone: str = "UTC"
+    debug: bool = False
+    # per-user reminder lists kept in memory (see db.reminders_cache)
+    cache_size: int = 10000
+    cache_ttl: float = 600.0
+    # write-behind history journal for button presses (see journal.py)
+    journal_path: str = "history.journal"
+    journal_flush_interval: float = 1.0
+    journal_max_batch: int = 500
+    journal_fsync: bool = False
+    # update processing limits (see middlewares.PriorityMiddleware)
+    max_in_flight: int = 64
+    per_user_in_flight: int = 2
+    shed_after: float = 2.0
+    # several bots in one process (see tenancy.load_tenants)
+    tenants_file: str = ""
+    # graceful shutdown and warm restart (see snapshot.py)
+    snapshot_path: str = "state.snapshot.json"
+    shutdown_timeout: float = 10.0
+    catchup_minutes: int = 15
+    # reminder button presses remembered for deduplication (see dedupe.py)
+    dedupe_size: int = 50000
+    dedupe_ttl: float = 172800.0
+    # /broadcast (see broadcast.py); Telegram allows a bot ~30 messages/s,
+    # reminders take 25 of them by default and load_tenants refuses more
+    admin_ids: FrozenSet[int] = frozenset()
+    broadcast_rate: float = 5.0
+    broadcast_concurrency: int = 4
+    broadcast_page_size: int = 200
+    # /import in chat stops at this many reminders per user (the CLI doesn't)
+    max_reminders_per_user: int = 200
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            bot_token=os.getenv("BOT_TOKEN", ""),
+            db_path=os.getenv("DB_PATH", "pills.db"),
+            db_busy_timeout=float(os.getenv("DB_BUSY_TIMEOUT", "30")),
+            online_index_builds=_flag("ONLINE_INDEX_BUILDS"),
+            strings_path=os.getenv("STRINGS_PATH", "strings.json"),
+            timezone=os.getenv("TZ", "UTC"),
+            debug=_flag("DEBUG"),
+            cache_size=int(os.getenv("CACHE_SIZE", "10000")),
+            cache_ttl=float(os.getenv("CACHE_TTL", "600")),
+            journal_path=os.getenv("JOURNAL_PATH", "history.journal"),
+            journal_flush_interval=float(os.getenv("JOURNAL_FLUSH_INTERVAL", "1.0")),
+            journal_max_batch=int(os.getenv("JOURNAL_MAX_BATCH", "500")),
+            journal_fsync=_flag("JOURNAL_FSYNC"),
+            max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "64")),
+            per_user_in_flight=int(os.getenv("PER_USER_IN_FLIGHT", "2")),
+            shed_after=float(os.getenv("SHED_AFTER", "2.0")),
+            tenants_file=os.getenv("TENANTS_FILE", ""),
+            snapshot_path=os.getenv("SNAPSHOT_PATH", "state.snapshot.json"),
+            shutdown_timeout=float(os.getenv("SHUTDOWN_TIMEOUT", "10")),
+            catchup_minutes=int(os.getenv("CATCHUP_MINUTES", "15")),
+            dedupe_size=int(os.getenv("DEDUPE_SIZE", "50000")),
+            dedupe_ttl=float(os.getenv("DEDUPE_TTL", "172800")),
+            admin_ids=_ids("ADMIN_IDS"),
+            broadcast_rate=float(os.getenv("BROADCAST_RATE", "5")),
+            broadcast_concurrency=int(os.getenv("BROADCAST_CONCURRENCY", "4")),
+            broadcast_page_size=int(os.getenv("BROADCAST_PAGE_SIZE", "200")),
+            max_reminders_per_user=int(os.getenv("MAX_REMINDERS_PER_USER", "200")),
+        )
+
+
+def load_settings() -> Settings:
+    # python-dotenv is only needed by whoever actually reads settings
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return Settings.from_env()
+
 
+def require_bot_token() -> str:
+    if not settings.bot_token:
+        raise RuntimeError("BOT_TOKEN is not set in .env")
+    return settings.bot_token
 
-settings = Settings(
-    bot_token=os.getenv("BOT_TOKEN", ""),
-)
 
-if not settings.bot_token:
-    raise RuntimeError("BOT_TOKEN is not set in .env")
+# built on first use, not at import
+settings = LazyObject(load_settings)
@@ -1,20 +1,103 @@
 # db.py
+import asyncio
+import logging
 import sqlite3
-from datetime import date
-from typing import List, Optional
+import time
+from typing import Iterable, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+import clock
+from cache import TTLCache
 from config import settings
+from tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+# (tenant, user_id) -> (version, list of that user's reminders), as served
+# to /list, /edit, /delete (sized from settings in bootstrap.bootstrap)
+reminders_cache = TTLCache(maxsize=10000, ttl=600.0)
+
+# idle connections kept per database file
+POOL_SIZE = 8
+_pools = {}
+
+
+class PooledConnection(sqlite3.Connection):
+    """close() hands the connection back to the pool instead of closing it."""
+
+    def close(self) -> None:
+        if self.in_transaction:
+            self.rollback()
+        pool = _pools.setdefault(self.path, [])
+        if len(pool) < POOL_SIZE:
+            pool.append(self)
+        else:
+            super().close()
 
 
 def get_connection() -> sqlite3.Connection:
-    conn = sqlite3.connect(settings.db_path)
+    # every helper used to open and close its own connection; they still
+    # call close(), but the connection is now reused by the next caller
+    pool = _pools.get(settings.db_path)
+    if pool:
+        try:
+            return pool.pop()
+        except IndexError:
+            pass
+    conn = sqlite3.connect(
+        settings.db_path,
+        factory=PooledConnection,
+        # pooled connections may be picked up by asyncio.to_thread workers
+        check_same_thread=False,
+        timeout=settings.db_busy_timeout,
+    )
+    # readers and the writer don't block each other; persistent, but
+    # cheap to repeat once per pooled connection
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.path = settings.db_path
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def init_db() -> None:
-    conn = get_connection()
-    cur = conn.cursor()
+def close_all_connections() -> None:
+    for pool in _pools.values():
+        while pool:
+            sqlite3.Connection.close(pool.pop())
+
+
+def _tenant(tenant: Optional[str]) -> str:
+    return tenant or current_tenant.get()
+
 
+# --- schema migrations ---
+#
+# PRAGMA user_version is the number of the last applied migration.
+# Migrations only change the schema and run at start-up, each in its own
+# transaction; anything that has to touch every row is a backfill
+# instead, run in small time-boxed batches while the bot keeps serving
+# (see run_backfills).
+
+MIGRATIONS = []  # (version, description, apply(cur)) in order
+
+
+def migration(version: int, description: str):
+    def register(func):
+        if MIGRATIONS and MIGRATIONS[-1][0] >= version:
+            raise RuntimeError(f"migration {version} is out of order")
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+
+def _add_column(cur: sqlite3.Cursor, table: str, column: str, ddl: str) -> None:
+    columns = {r["name"] for r in cur.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+@migration(1, "reminders and history tables")
+def _m1_initial(cur: sqlite3.Cursor) -> None:
+    # IF NOT EXISTS: databases from before versioning already have them
     cur.execute("""
         CREATE TABLE IF NOT EXISTS reminders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,7 +108,6 @@ def init_db() -> None:
             last_sent_date TEXT       -- 'YYYY-MM-DD' or NULL
         )
     """)
-
     cur.execute("""
         CREATE TABLE IF NOT EXISTS history (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -36,49 +118,380 @@ def init_db() -> None:
         )
     """)
 
-    conn.commit()
+
+@migration(2, "tenant column for multi-bot support")
+def _m2_tenant(cur: sqlite3.Cursor) -> None:
+    _add_column(cur, "reminders", "tenant", "TEXT NOT NULL DEFAULT 'default'")
+    _add_column(cur, "history", "tenant", "TEXT NOT NULL DEFAULT 'default'")
+
+
+@migration(3, "broadcasts table")
+def _m3_broadcasts(cur: sqlite3.Cursor) -> None:
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tenant TEXT NOT NULL,
+            text TEXT NOT NULL,
+            created_by INTEGER NOT NULL,
+            created_at TEXT NOT NULL,     -- ISO datetime
+            status TEXT NOT NULL,         -- 'running' or 'done'
+            last_user_id INTEGER NOT NULL DEFAULT 0,  -- checkpoint: sent up to here
+            delivered INTEGER NOT NULL DEFAULT 0,
+            blocked INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            finished_at TEXT
+        )
+    """)
+
+
+@migration(4, "indexes for the tick and per-user lists")
+def _m4_indexes(cur: sqlite3.Cursor) -> None:
+    # every tick looked up its minute with a full scan of reminders;
+    # history's indexes are built after start-up, see ONLINE_INDEXES
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminders_time ON reminders(time_str)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reminders_user ON reminders(user_id, tenant)")
+
+
+@migration(5, "history.user_id, filled by the history_user_id backfill")
+def _m5_history_user_id(cur: sqlite3.Cursor) -> None:
+    _add_column(cur, "history", "user_id", "INTEGER")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS backfills (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,   -- rows up to here are done
+            rows INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO backfills (name) VALUES ('history_user_id')")
+
+
+@migration(6, "per-user reminder versions, bumped by triggers")
+def _m6_reminder_versions(cur: sqlite3.Cursor) -> None:
+    # the triggers see every write, including the transfer CLI or a manual
+    # fix from another process, so a cached list can be checked against it;
+    # last_sent_date changes don't show in the lists and don't count
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS reminder_versions (
+            tenant TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (tenant, user_id)
+        ) WITHOUT ROWID
+    """)
+    bump = (
+        "INSERT INTO reminder_versions (tenant, user_id, version) VALUES ({row}.tenant, {row}.user_id, 1) "
+        "ON CONFLICT (tenant, user_id) DO UPDATE SET version = version + 1;"
+    )
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS reminders_version_insert AFTER INSERT ON reminders
+        BEGIN {bump.format(row="NEW")} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS reminders_version_update
+        AFTER UPDATE OF user_id, pill_name, time_str, days, tenant ON reminders
+        BEGIN {bump.format(row="OLD")} {bump.format(row="NEW")} END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS reminders_version_delete AFTER DELETE ON reminders
+        BEGIN {bump.format(row="OLD")} END
+    """)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(target: Optional[int] = None) -> List[int]:
+    """Applies pending migrations up to `target` (default: all). Returns their versions."""
+    conn = get_connection()
+    applied = []
+    try:
+        for version, _, apply in MIGRATIONS:
+            if target is not None and version > target:
+                break
+            # re-read inside the write lock: another process may have migrated
+            conn.execute("BEGIN IMMEDIATE")
+            if version <= schema_version(conn):
+                conn.rollback()
+                continue
+            apply(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            applied.append(version)
+    finally:
+        conn.close()
+    return applied
+
+
+def init_db() -> None:
+    applied = migrate()
+    if applied:
+        logger.info("[db] applied migrations %s", applied)
+
+
+# --- backfills ---
+#
+# A backfill walks a table in id order, one short write transaction per
+# batch, and records how far it got in the same transaction – a restart
+# continues where the last committed batch ended.
+
+BACKFILLS = {}  # name -> batch(cur, after_id, until_id) -> rows changed
+BACKFILL_BUDGET = 0.05   # seconds a batch may hold the write lock
+BACKFILL_PAUSE = 0.5     # seconds between batches, for everybody else
+BACKFILL_MAX_BATCH = 50000
+
+# (db path, name) of backfills known to be complete, see backfill_done()
+_backfilled = set()
+
+
+def backfill(name: str, table: str):
+    def register(func):
+        BACKFILLS[name] = (table, func)
+        return func
+    return register
+
+
+@backfill("history_user_id", "history")
+def _fill_history_user_id(cur: sqlite3.Cursor, after_id: int, until_id: int) -> int:
+    # NOT INDEXED: walk the rowid range, not idx_history_user's NULLs
+    cur.execute(
+        "UPDATE history NOT INDEXED SET user_id = "
+        "(SELECT user_id FROM reminders WHERE reminders.id = history.reminder_id) "
+        "WHERE id > ? AND id <= ? AND user_id IS NULL",
+        (after_id, until_id),
+    )
+    return cur.rowcount
+
+
+def backfill_done(name: str) -> bool:
+    if (settings.db_path, name) in _backfilled:
+        return True
+    conn = get_connection()
+    row = conn.execute("SELECT done FROM backfills WHERE name = ?", (name,)).fetchone()
+    conn.close()
+    if row is not None and row["done"]:
+        _backfilled.add((settings.db_path, name))
+        return True
+    return False
+
+
+def backfill_progress() -> List[dict]:
+    conn = get_connection()
+    rows = [dict(r) for r in conn.execute("SELECT * FROM backfills ORDER BY name")]
+    for row in rows:
+        table, _ = BACKFILLS.get(row["name"], (None, None))
+        if table is not None:
+            row["max_id"] = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+    conn.close()
+    return rows
+
+
+def run_backfill_batch(name: str, batch_size: int) -> bool:
+    """One batch of `name`. Returns True once the backfill is complete."""
+    table, batch = BACKFILLS[name]
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT last_id, done FROM backfills WHERE name = ?", (name,)).fetchone()
+        if row is None or row["done"]:
+            conn.rollback()
+            return True
+        # rows inserted after the schema change are written complete,
+        # so the backfill only has to reach the current end of the table
+        max_id = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+        until_id = min(row["last_id"] + batch_size, max_id)
+        changed = batch(conn.cursor(), row["last_id"], until_id) if until_id > row["last_id"] else 0
+        done = until_id >= max_id
+        conn.execute(
+            "UPDATE backfills SET last_id = ?, rows = rows + ?, done = ?, updated_at = ? "
+            "WHERE name = ?",
+            (until_id, changed, int(done), _now_iso(), name),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    if done:
+        _backfilled.add((settings.db_path, name))
+    return done
+
+
+def pending_backfills() -> List[str]:
+    return [name for name in BACKFILLS if not backfill_done(name)]
+
+
+async def run_backfills(budget: float = BACKFILL_BUDGET, pause: float = BACKFILL_PAUSE,
+                        batch_size: int = 1000) -> None:
+    """
+    Background task of the bot process: builds the online indexes (only
+    with ONLINE_INDEX_BUILDS), then runs the backfills. Batches run off the event loop and are sized so
+    that one holds the write lock for about `budget` seconds; cancelling
+    it loses at most the batch in progress.
+    """
+    indexes = pending_indexes()
+    if indexes and not settings.online_index_builds:
+        logger.warning(
+            "[index] %s missing, run `python db.py backfill` in a maintenance window",
+            ", ".join(indexes),
+        )
+        indexes = []
+    for name in indexes:
+        logger.info("[index] %s started", name)
+        elapsed = await asyncio.to_thread(build_index, name)
+        logger.info("[index] %s done", name, extra={"fields": {"s": round(elapsed, 3)}})
+        await asyncio.sleep(pause)
+
+    for name in pending_backfills():
+        logger.info("[backfill] %s started", name)
+        while True:
+            started = time.perf_counter()
+            done = await asyncio.to_thread(run_backfill_batch, name, batch_size)
+            if done:
+                break
+            batch_size = _next_batch_size(batch_size, time.perf_counter() - started, budget)
+            await asyncio.sleep(pause)
+        logger.info("[backfill] %s done", name)
+
+
+def _next_batch_size(size: int, elapsed: float, budget: float) -> int:
+    if elapsed > budget:
+        return max(10, size // 2)
+    if elapsed < budget / 2:
+        return min(BACKFILL_MAX_BATCH, size * 2)
+    return size
+
+
+# --- online indexes ---
+#
+# Indexes on tables that grow without bound (history) are not built by
+# migrations, which block start-up. SQLite builds an index in one write
+# transaction, which on a big history outlasts the busy timeout of every
+# other writer, so they are built by `python db.py backfill` in a
+# maintenance window – or by run_backfills in the bot when
+# ONLINE_INDEX_BUILDS is set (small databases). Queries work without
+# them, only slower.
+
+ONLINE_INDEXES = {
+    # history joined from reminders: /history before the backfill, export
+    "idx_history_reminder": "CREATE INDEX IF NOT EXISTS idx_history_reminder ON history(reminder_id)",
+    # /history pages once history.user_id is filled in
+    "idx_history_user": "CREATE INDEX IF NOT EXISTS idx_history_user ON history(user_id, sent_at)",
+}
+
+
+# (db path, name) of indexes known to exist, see index_ready()
+_indexed = set()
+
+
+def pending_indexes() -> List[str]:
+    conn = get_connection()
+    existing = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
     conn.close()
+    _indexed.update((settings.db_path, name) for name in existing)
+    return [name for name in ONLINE_INDEXES if name not in existing]
+
+
+def index_ready(name: str) -> bool:
+    return (settings.db_path, name) in _indexed or name not in pending_indexes()
+
+
+def build_index(name: str) -> float:
+    """Builds one of ONLINE_INDEXES. Returns the seconds it took."""
+    conn = get_connection()
+    started = time.perf_counter()
+    try:
+        conn.execute(ONLINE_INDEXES[name])
+        conn.commit()
+    finally:
+        conn.close()
+    return time.perf_counter() - started
 
 
 # --- CRUD helpers ---
 
-def create_reminder(user_id: int, pill_name: str, time_str: str, days: str) -> int:
+def create_reminder(user_id: int, pill_name: str, time_str: str, days: str,
+                    tenant: Optional[str] = None) -> int:
+    tenant = _tenant(tenant)
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO reminders (user_id, pill_name, time_str, days, last_sent_date) "
-        "VALUES (?, ?, ?, ?, NULL)",
-        (user_id, pill_name, time_str, days),
+        "INSERT INTO reminders (user_id, pill_name, time_str, days, last_sent_date, tenant) "
+        "VALUES (?, ?, ?, ?, NULL, ?)",
+        (user_id, pill_name, time_str, days, tenant),
     )
     conn.commit()
     reminder_id = cur.lastrowid
     conn.close()
+    reminders_cache.invalidate((tenant, user_id))
     return reminder_id
 
 
-def get_user_reminders(user_id: int):
-    conn = get_connection()
-    cur = conn.cursor()
+def _reminders_version(cur: sqlite3.Cursor, user_id: int, tenant: str) -> int:
     cur.execute(
-        "SELECT id, pill_name, time_str, days FROM reminders "
-        "WHERE user_id = ? ORDER BY time_str",
-        (user_id,),
+        "SELECT version FROM reminder_versions WHERE tenant = ? AND user_id = ?",
+        (tenant, user_id),
     )
-    rows = cur.fetchall()
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+def reminders_version() -> int:
+    """Grows with every write to reminders, from any process (see migration 6)."""
+    conn = get_connection()
+    row = conn.execute("SELECT COALESCE(SUM(version), 0) FROM reminder_versions").fetchone()
     conn.close()
-    return rows
+    return row[0]
 
 
-def get_reminder(user_id: int, reminder_id: int) -> Optional[sqlite3.Row]:
+def get_user_reminders(user_id: int, tenant: Optional[str] = None) -> List[dict]:
+    # cached as (version, rows); a primary-key lookup of the version on
+    # every hit catches writes made by other processes (transfer CLI)
+    tenant = _tenant(tenant)
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM reminders WHERE id = ? AND user_id = ?",
-        (reminder_id, user_id),
+    # read before the rows: a write in between only costs a reload next time
+    version = _reminders_version(cur, user_id, tenant)
+    cached = reminders_cache.get((tenant, user_id), valid=lambda c: c[0] == version)
+    if cached is not None:
+        rows = cached[1]
+    else:
+        cur.execute(
+            "SELECT id, user_id, pill_name, time_str, days FROM reminders "
+            "WHERE user_id = ? AND tenant = ? ORDER BY time_str",
+            (user_id, tenant),
+        )
+        rows = [dict(r) for r in cur.fetchall()]
+        reminders_cache.set((tenant, user_id), (version, rows))
+    conn.close()
+    return list(rows)
+
+
+def get_reminder(user_id: int, reminder_id: int, tenant: Optional[str] = None) -> Optional[dict]:
+    # served from the user's cached list; last_sent_date is not included
+    for row in get_user_reminders(user_id, tenant):
+        if row["id"] == reminder_id:
+            return dict(row)
+    return None
+
+
+def create_reminders_many(user_id: int, rows: Iterable[tuple],
+                          tenant: Optional[str] = None) -> int:
+    # rows: (pill_name, time_str, days) – one transaction for the batch
+    tenant = _tenant(tenant)
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT INTO reminders (user_id, pill_name, time_str, days, last_sent_date, tenant) "
+        "VALUES (?, ?, ?, ?, NULL, ?)",
+        ((user_id, *row, tenant) for row in rows),
     )
-    row = cur.fetchone()
+    count = cur.rowcount
+    conn.commit()
     conn.close()
-    return row
+    # no reminders_cache.invalidate(): /import runs this in a worker thread
+    # and the cache isn't thread-safe; the bumped version retires the list
+    return count
 
 
 def get_reminder_by_id(reminder_id: int) -> Optional[sqlite3.Row]:
@@ -90,12 +503,13 @@ def get_reminder_by_id(reminder_id: int) -> Optional[sqlite3.Row]:
     return row
 
 
-def delete_reminder(user_id: int, reminder_id: int) -> Optional[str]:
+def delete_reminder(user_id: int, reminder_id: int, tenant: Optional[str] = None) -> Optional[str]:
+    tenant = _tenant(tenant)
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "SELECT pill_name FROM reminders WHERE id = ? AND user_id = ?",
-        (reminder_id, user_id),
+        "SELECT pill_name FROM reminders WHERE id = ? AND user_id = ? AND tenant = ?",
+        (reminder_id, user_id, tenant),
     )
     row = cur.fetchone()
     if not row:
@@ -108,6 +522,7 @@ def delete_reminder(user_id: int, reminder_id: int) -> Optional[str]:
     )
     conn.commit()
     conn.close()
+    reminders_cache.invalidate((tenant, user_id))
     return row["pill_name"]
 
 
@@ -116,18 +531,22 @@ def update_reminder(reminder_id: int, time_str: str, days: str) -> None:
     cur = conn.cursor()
     cur.execute(
         "UPDATE reminders SET time_str = ?, days = ?, last_sent_date = NULL "
-        "WHERE id = ?",
+        "WHERE id = ? RETURNING user_id, tenant",
         (time_str, days, reminder_id),
     )
+    row = cur.fetchone()
     conn.commit()
     conn.close()
+    if row:
+        reminders_cache.invalidate((row["tenant"], row["user_id"]))
 
 
 def get_reminders_for_time(time_str: str):
+    # every tenant's reminders – the tick is shared
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        "SELECT id, user_id, pill_name, days, last_sent_date "
+        "SELECT id, user_id, pill_name, days, last_sent_date, tenant "
         "FROM reminders WHERE time_str = ?",
         (time_str,),
     )
@@ -136,8 +555,10 @@ def get_reminders_for_time(time_str: str):
     return rows
 
 
-def set_last_sent_today(reminder_id: int) -> None:
-    today_str = date.today().isoformat()
+def set_last_sent_today(reminder_id: int, today_str: Optional[str] = None) -> None:
+    # "today" is the bot's timezone date, same as check_reminders_job uses
+    if today_str is None:
+        today_str = clock.today(ZoneInfo(settings.timezone)).isoformat()
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
@@ -148,31 +569,327 @@ def set_last_sent_today(reminder_id: int) -> None:
     conn.close()
 
 
-def insert_history(reminder_id: int, sent_at: str, action: str) -> None:
+# user_id is copied from the reminder, so new rows never need the backfill
+_INSERT_HISTORY = (
+    "INSERT INTO history (reminder_id, sent_at, action, tenant, user_id) "
+    "VALUES (?, ?, ?, ?, (SELECT user_id FROM reminders WHERE id = ?))"
+)
+
+
+def insert_history(reminder_id: int, sent_at: str, action: str,
+                   tenant: Optional[str] = None) -> None:
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute(
-        "INSERT INTO history (reminder_id, sent_at, action) VALUES (?, ?, ?)",
-        (reminder_id, sent_at, action),
-    )
+    cur.execute(_INSERT_HISTORY, (reminder_id, sent_at, action, _tenant(tenant), reminder_id))
+    conn.commit()
+    conn.close()
+
+
+def record_sent(reminder_id: int, today_str: str, sent_at: str, action: str,
+                tenant: Optional[str] = None) -> None:
+    """set_last_sent_today + insert_history for a delivered reminder, in one transaction."""
+    conn = get_connection()
+    try:
+        conn.execute(
+            "UPDATE reminders SET last_sent_date = ? WHERE id = ?",
+            (today_str, reminder_id),
+        )
+        conn.execute(_INSERT_HISTORY, (reminder_id, sent_at, action, _tenant(tenant), reminder_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def insert_history_many(rows: List[tuple]) -> None:
+    # rows: (reminder_id, sent_at, action, tenant) – one transaction for the batch
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.executemany(_INSERT_HISTORY, ((*row, row[0]) for row in rows))
     conn.commit()
     conn.close()
 
 
-def get_recent_history(user_id: int, limit: int = 20):
+def get_recent_history(user_id: int, limit: int = 20, offset: int = 0,
+                       tenant: Optional[str] = None):
+    # once history.user_id is filled in, idx_history_user serves the page
+    # directly instead of collecting and sorting all the user's history
+    direct = backfill_done("history_user_id") and index_ready("idx_history_user")
+    owner = "h" if direct else "r"
     conn = get_connection()
     cur = conn.cursor()
     cur.execute(
-        """
+        f"""
         SELECT h.sent_at, h.action, r.pill_name
         FROM history h
         JOIN reminders r ON r.id = h.reminder_id
-        WHERE r.user_id = ?
+        WHERE {owner}.user_id = ? AND r.tenant = ?
         ORDER BY h.sent_at DESC
-        LIMIT ?
+        LIMIT ? OFFSET ?
         """,
-        (user_id, limit),
+        (user_id, _tenant(tenant), limit, offset),
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+# --- streaming reads for export ---
+
+def _iter_query(sql: str, params: tuple, batch: int) -> Iterator[sqlite3.Row]:
+    conn = get_connection()
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        conn.close()
+
+
+def _where(filters: dict) -> tuple:
+    filters = {k: v for k, v in filters.items() if v is not None}
+    if not filters:
+        return "", ()
+    return " WHERE " + " AND ".join(f"{k} = ?" for k in filters), tuple(filters.values())
+
+
+def iter_reminders(user_id: Optional[int] = None, tenant: Optional[str] = None,
+                   batch: int = 1000) -> Iterator[sqlite3.Row]:
+    # None filters stream everything (offline export)
+    where, params = _where({"user_id": user_id, "tenant": tenant})
+    sql = "SELECT id, user_id, pill_name, time_str, days, tenant FROM reminders"
+    return _iter_query(sql + where + " ORDER BY id", params, batch)
+
+
+def iter_history(user_id: Optional[int] = None, tenant: Optional[str] = None,
+                 batch: int = 1000) -> Iterator[sqlite3.Row]:
+    where, params = _where({"r.user_id": user_id, "r.tenant": tenant})
+    sql = (
+        "SELECT h.reminder_id, r.user_id, r.pill_name, h.sent_at, h.action, h.tenant "
+        "FROM history h JOIN reminders r ON r.id = h.reminder_id"
+    )
+    return _iter_query(sql + where + " ORDER BY h.id", params, batch)
+
+
+def get_reminder_ids(user_id: int, tenant: Optional[str] = None) -> set:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id FROM reminders WHERE user_id = ? AND tenant = ?",
+        (user_id, _tenant(tenant)),
+    )
+    ids = {r["id"] for r in cur.fetchall()}
+    conn.close()
+    return ids
+
+
+# --- broadcasts ---
+
+def _now_iso() -> str:
+    return clock.now(ZoneInfo(settings.timezone)).isoformat(timespec="seconds")
+
+
+def get_recipients_page(tenant: str, after_user_id: int, limit: int) -> List[int]:
+    # keyset pagination: the next `limit` users with reminders after the checkpoint
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT DISTINCT user_id FROM reminders "
+        "WHERE tenant = ? AND user_id > ? ORDER BY user_id LIMIT ?",
+        (tenant, after_user_id, limit),
+    )
+    user_ids = [r["user_id"] for r in cur.fetchall()]
+    conn.close()
+    return user_ids
+
+
+def create_broadcast(tenant: str, text: str, created_by: int) -> int:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO broadcasts (tenant, text, created_by, created_at, status) "
+        "VALUES (?, ?, ?, ?, 'running')",
+        (tenant, text, created_by, _now_iso()),
     )
+    conn.commit()
+    broadcast_id = cur.lastrowid
+    conn.close()
+    return broadcast_id
+
+
+def get_broadcast(broadcast_id: int) -> Optional[sqlite3.Row]:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row
+
+
+def get_broadcasts(status: Optional[str] = None, tenant: Optional[str] = None,
+                   limit: int = 5) -> List[sqlite3.Row]:
+    where, params = _where({"status": status, "tenant": tenant})
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(f"SELECT * FROM broadcasts{where} ORDER BY id DESC LIMIT ?", (*params, limit))
     rows = cur.fetchall()
     conn.close()
     return rows
+
+
+def save_broadcast_progress(broadcast_id: int, last_user_id: int, delivered: int,
+                            blocked: int, failed: int, done: bool = False) -> None:
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE broadcasts SET last_user_id = ?, delivered = ?, blocked = ?, failed = ?, "
+        "status = ?, finished_at = ? WHERE id = ?",
+        (
+            last_user_id, delivered, blocked, failed,
+            "done" if done else "running",
+            _now_iso() if done else None,
+            broadcast_id,
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+# --- CLI ---
+
+def _status() -> dict:
+    conn = get_connection()
+    version = schema_version(conn)
+    has_backfills = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'backfills'"
+    ).fetchone()
+    conn.close()
+    return {
+        "db": settings.db_path,
+        "version": version,
+        "latest": MIGRATIONS[-1][0],
+        "pending": [f"{v}: {d}" for v, d, _ in MIGRATIONS if v > version],
+        "pending_indexes": pending_indexes(),
+        "backfills": backfill_progress() if has_backfills else [],
+    }
+
+
+def dry_run(budget: float = BACKFILL_BUDGET, pause: float = BACKFILL_PAUSE) -> dict:
+    """
+    Runs pending migrations, online indexes and backfills on a copy of
+    the database and reports how long they took there. Only migrations
+    block start-up; an index build holds the write lock for its time
+    while the bot is serving; backfills run online, so their estimate
+    includes the pauses between batches.
+    """
+    import os
+    import shutil
+    import tempfile
+
+    source_path = settings.db_path
+    workdir = tempfile.mkdtemp(prefix="pills-dry-run-")
+    copy_path = os.path.join(workdir, "copy.db")
+    # the backup API gives a consistent copy even while the bot is writing
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(copy_path)
+    started = time.perf_counter()
+    source.backup(target)
+    copy_s = time.perf_counter() - started
+    source.close()
+    target.close()
+
+    report = {"db": source_path, "size_mb": round(os.path.getsize(copy_path) / 2**20, 1),
+              "copy_s": round(copy_s, 3), "migrations": [], "indexes": [], "backfills": []}
+    settings.db_path = copy_path
+    try:
+        conn = get_connection()
+        current = schema_version(conn)
+        conn.close()
+        for version, description, _ in MIGRATIONS:
+            if version <= current:
+                continue
+            started = time.perf_counter()
+            migrate(target=version)
+            report["migrations"].append({
+                "version": version,
+                "description": description,
+                "blocking_s": round(time.perf_counter() - started, 3),
+            })
+        report["startup_s"] = round(sum(m["blocking_s"] for m in report["migrations"]), 3)
+
+        for name in pending_indexes():
+            report["indexes"].append({"name": name, "lock_s": round(build_index(name), 3)})
+
+        for name in pending_backfills():
+            batches, work, batch_size = 0, 0.0, 1000
+            while True:
+                started = time.perf_counter()
+                done = run_backfill_batch(name, batch_size)
+                elapsed = time.perf_counter() - started
+                work += elapsed
+                batches += 1
+                if done:
+                    break
+                batch_size = _next_batch_size(batch_size, elapsed, budget)
+            rows = next(r["rows"] for r in backfill_progress() if r["name"] == name)
+            report["backfills"].append({
+                "name": name,
+                "rows": rows,
+                "batches": batches,
+                "work_s": round(work, 3),
+                "online_estimate_s": round(work + (batches - 1) * pause, 1),
+            })
+    finally:
+        close_all_connections()
+        settings.db_path = source_path
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+def main(argv=None) -> int:
+    """
+    python db.py status              schema version, pending migrations, backfills
+    python db.py migrate             apply pending migrations (the bot does this at start)
+    python db.py migrate --dry-run   time migrations and backfills on a copy
+    python db.py backfill            build indexes and finish backfills offline, without pauses
+    """
+    import argparse
+    import json
+
+    p = argparse.ArgumentParser(description=main.__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("command", choices=("status", "migrate", "backfill"))
+    p.add_argument("--db", help="database file (default: DB_PATH)")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--budget", type=float, default=BACKFILL_BUDGET,
+                   help="seconds one backfill batch may hold the write lock")
+    p.add_argument("--pause", type=float, default=BACKFILL_PAUSE,
+                   help="seconds between backfill batches")
+    args = p.parse_args(argv)
+    if args.db:
+        settings.db_path = args.db
+
+    if args.command == "migrate" and args.dry_run:
+        result = dry_run(args.budget, args.pause)
+    elif args.command == "migrate":
+        result = {"applied": migrate()}
+    elif args.command == "backfill":
+        migrate()
+        for name in pending_indexes():
+            build_index(name)
+        for name in pending_backfills():
+            while not run_backfill_batch(name, BACKFILL_MAX_BATCH):
+                pass
+        result = {"backfills": backfill_progress()}
+    else:
+        result = _status()
+    print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# dedupe.py
+"""
+Idempotent reminder buttons.
+
+Every reminder message gets a short random token in its callback data
+("taken:<id>:<token>", "snooze:<id>:<minutes>:<token>"). The first press
+of a message claims (tenant, reminder id, token); double taps and
+Telegram redeliveries of it find the claim and are answered from memory
+with the same text, without touching the DB, the scheduler or the
+message. Presses on a message that a newer one for the same reminder has
+replaced are stale and only get a short answer.
+"""
+import secrets
+from typing import Optional, Tuple
+
+from cache import TTLCache
+
+# (tenant, reminder_id, token) -> answer shown for the first press
+handled = TTLCache(maxsize=50000, ttl=172800.0)
+# (tenant, reminder_id) -> token of the newest message sent for it
+latest = TTLCache(maxsize=50000, ttl=172800.0)
+
+Key = Tuple[str, int, str]
+
+
+def new_token() -> str:
+    # 8 hex chars keep "snooze:<id>:15:<token>" far below the 64-byte limit
+    return secrets.token_hex(4)
+
+
+def mark_sent(tenant: str, reminder_id: int, token: str) -> None:
+    latest.set((tenant, reminder_id), token)
+
+
+def is_stale(tenant: str, reminder_id: int, token: str) -> bool:
+    newest = latest.get((tenant, reminder_id), count=False)
+    return newest is not None and newest != token
+
+
+def claim(key: Key, answer: str) -> Optional[str]:
+    """
+    Marks the press as handled. Returns None for the first press,
+    otherwise the answer the first one got.
+    """
+    if handled.add(key, answer):
+        return None
+    return handled.get(key, answer, count=False)
+
+
+def release(key: Key) -> None:
+    """The claimed press failed half way; let a retry through."""
+    handled.invalidate(key)
@@ -0,0 +1,67 @@
+# handlers/admin.py
+from aiogram import Bot, Dispatcher
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from broadcast import start_broadcast
+from config import settings
+from db import create_broadcast, get_broadcasts, reminders_cache
+from journal import history_journal
+from middlewares import PriorityMiddleware
+from strings import strings
+from tenancy import current_tenant
+
+
+def is_admin(message: Message) -> bool:
+    return message.from_user is not None and message.from_user.id in settings.admin_ids
+
+
+async def cmd_broadcast(message: Message, command: CommandObject, bot: Bot):
+    # /broadcast <text> – goes to every user of this bot, as plain text
+    text = (command.args or "").strip()
+    if not text:
+        await message.answer(strings.texts["broadcast_usage"], parse_mode="Markdown")
+        return
+
+    broadcast_id = create_broadcast(current_tenant.get(), text, message.from_user.id)
+    start_broadcast(bot, broadcast_id)
+    await message.answer(strings.texts["broadcast_started"].format(id=broadcast_id))
+
+
+async def cmd_broadcasts(message: Message):
+    # the last few broadcasts with their counts so far
+    rows = get_broadcasts(tenant=current_tenant.get())
+    if not rows:
+        await message.answer(strings.texts["broadcast_none"])
+        return
+    lines = [
+        strings.texts["broadcast_status_line"].format(
+            id=r["id"],
+            status=r["status"],
+            delivered=r["delivered"],
+            blocked=r["blocked"],
+            failed=r["failed"],
+        )
+        for r in rows
+    ]
+    await message.answer("\n".join(lines))
+
+
+def format_stats(name: str, stats: dict) -> str:
+    return f"{name}: " + ", ".join(f"{key}={value}" for key, value in stats.items())
+
+
+async def cmd_stats(message: Message, priority: PriorityMiddleware):
+    # internal counters, for whoever runs the bot – plain text, not localized
+    lines = [
+        format_stats("updates", priority.stats()),
+        format_stats("journal", history_journal.stats()),
+        format_stats("cache", reminders_cache.stats()),
+    ]
+    await message.answer("\n".join(lines), parse_mode=None)
+
+
+def register_admin_handlers(dp: Dispatcher):
+    dp.message.register(cmd_broadcast, Command("broadcast"), is_admin)
+    dp.message.register(cmd_broadcasts, Command("broadcasts"), is_admin)
+    dp.message.register(cmd_stats, Command("stats"), is_admin)
@@ -1,12 +1,19 @@
 # handlers/common.py
-from aiogram import Dispatcher
+from typing import Optional, Tuple
+
+from aiogram import Dispatcher, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from aiogram.types import Message, ReplyKeyboardRemove
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 
 from strings import strings
-from keyboards import main_keyboard
+from keyboards import main_keyboard, pager_inline
 from db import get_recent_history
+from journal import history_journal
+from pagination import footer_room, page_starts, render_page, shorten
+
+HISTORY_PAGE_SIZE = 20
 
 
 async def back_to_main_handler(message: Message, state: FSMContext):
@@ -30,16 +37,69 @@ async def cmd_cancel(message: Message, state: FSMContext):
     )
 
 
+async def edit_page(callback: CallbackQuery, text: str,
+                    reply_markup: Optional[InlineKeyboardMarkup]):
+    """
+    Swap the page shown in a paginated message in place.
+    """
+    try:
+        await callback.message.edit_text(
+            text,
+            parse_mode="Markdown",
+            reply_markup=reply_markup,
+        )
+    except TelegramBadRequest as e:
+        # double tap on the same button – the page is already shown
+        if "message is not modified" not in str(e):
+            raise
+    await callback.answer()
+
+
+async def render_history_page(user_id: int, page: int) -> Tuple[Optional[str], Optional[InlineKeyboardMarkup]]:
+    # presses still sitting in the write-behind buffer should show up too
+    await history_journal.flush()
+    # pages are cut from the top (see page_starts), so this reads every
+    # row up to this page; page `page` ends by row (page + 1) * size, and
+    # one extra row tells whether there is a next page
+    rows = get_recent_history(
+        user_id,
+        limit=(page + 1) * HISTORY_PAGE_SIZE + 1,
+    )
+    lines = [f"{r['sent_at']} — {shorten(r['pill_name'])} ({r['action']})" for r in rows]
+
+    header = "📜 *Last reminders:*"
+    template = strings.texts["history_page_footer"]
+    starts = page_starts(header, lines, HISTORY_PAGE_SIZE, footer_room(template))
+    if not lines or page >= len(starts):
+        return None, None
+    end = starts[page + 1] if page + 1 < len(starts) else len(lines)
+    has_next = end < len(lines)
+
+    footer = ""
+    if page or has_next:
+        footer = template.format(page=page + 1)
+    text = render_page(header, lines[starts[page]:end], footer)
+    return text, pager_inline("history", page, has_next)
+
+
 async def history_handler(message: Message):
-    rows = get_recent_history(message.from_user.id)
-    if not rows:
+    text, kb = await render_history_page(message.from_user.id, 0)
+    if text is None:
         await message.answer(strings.texts["history_empty"])
         return
 
-    lines = []
-    for r in rows:
-        lines.append(f"{r['sent_at']} — {r['pill_name']} ({r['action']})")
-    await message.answer("📜 *Last reminders:*\n\n" + "\n".join(lines), parse_mode="Markdown")
+    await message.answer(text, parse_mode="Markdown", reply_markup=kb)
+
+
+async def history_page_callback(callback: CallbackQuery):
+    # page:history:<page>
+    page = int(callback.data.rsplit(":", 1)[1])
+    text, kb = await render_history_page(callback.from_user.id, page)
+    if text is None:
+        await callback.answer(strings.texts["history_empty"])
+        return
+
+    await edit_page(callback, text, kb)
 
 
 def register_common_handlers(dp: Dispatcher):
@@ -49,6 +109,10 @@ def register_common_handlers(dp: Dispatcher):
     dp.message.register(history_handler, Command("history"))
     dp.message.register(history_handler, lambda m: m.text ==
                         strings.buttons["history"])
+    dp.callback_query.register(
+        history_page_callback,
+        F.data.startswith("page:history:"),
+    )
 
     # 👇 новий хендлер на кнопку "Назад у головне меню"
     dp.message.register(
@@ -1,5 +1,4 @@
 # handlers/pills.py
-from datetime import datetime
 from typing import Set, List
 
 from aiogram import Dispatcher, F
@@ -14,6 +13,7 @@ from keyboards import (
     days_select_keyboard,
     DAY_FULL_UA,
     back_keyboard,
+    pager_inline,
 )
 from states import AddPillStates, EditPillStates, DeletePillStates
 from db import (
@@ -23,45 +23,11 @@ from db import (
     get_reminder,
     update_reminder,
 )
+from handlers.common import edit_page
+from validators import valid_time_str, parse_days
+from pagination import footer_room, page_starts, render_page, shorten
 
-
-# ---------- Helpers ----------
-
-def valid_time_str(t: str) -> bool:
-    try:
-        datetime.strptime(t, "%H:%M")
-        return True
-    except ValueError:
-        return False
-
-
-def parse_days(text: str):
-    """
-    Still used for /edit where you type days manually (англійською).
-    """
-    text = text.strip().lower()
-    if text == "daily":
-        return "daily"
-
-    mapping = {
-        "mon": 0, "monday": 0,
-        "tue": 1, "tuesday": 1,
-        "wed": 2, "wednesday": 2,
-        "thu": 3, "thursday": 3,
-        "fri": 4, "friday": 4,
-        "sat": 5, "saturday": 5,
-        "sun": 6, "sunday": 6,
-    }
-    parts = [p.strip() for p in text.replace(";", ",").split(",") if p.strip()]
-    numbers = []
-    for p in parts:
-        if p in mapping:
-            numbers.append(mapping[p])
-        else:
-            return None
-    if not numbers:
-        return None
-    return ",".join(sorted(set(str(n) for n in numbers), key=int))
+LIST_PAGE_SIZE = 15
 
 
 # ---------- ADD PILL FLOW ----------
@@ -202,11 +168,12 @@ async def days_confirm_callback(callback: CallbackQuery, state: FSMContext):
 
 # ---------- LIST PILLS ----------
 
-async def list_pills(message: Message):
-    rows = get_user_reminders(message.from_user.id)
+def render_list_page(user_id: int, page: int):
+    # the whole list is already in memory (db.reminders_cache), so a page
+    # is just a slice of it
+    rows = get_user_reminders(user_id)
     if not rows:
-        await message.answer(strings.texts["list_empty"])
-        return
+        return None, None
 
     lines = []
     for r in rows:
@@ -215,15 +182,47 @@ async def list_pills(message: Message):
         else:
             readable = r["days"]  # raw 0,2,4 – можна потім гарно показати
         lines.append(
-            f"ID: *{r['id']}* — {r['pill_name']} о {r['time_str']} ({readable})"
+            f"ID: *{r['id']}* — {shorten(r['pill_name'])} о {r['time_str']} ({readable})"
         )
 
+    header = "📋 *Ваші пігулки:*"
+    template = strings.texts["page_footer"]
+    starts = page_starts(header, lines, LIST_PAGE_SIZE, footer_room(template))
+    pages = len(starts)
+    page = min(page, pages - 1)
+    end = starts[page + 1] if page + 1 < pages else len(lines)
+
+    footer = ""
+    if pages > 1:
+        footer = template.format(page=page + 1, pages=pages)
+    text = render_page(header, lines[starts[page]:end], footer)
+    return text, pager_inline("list", page, page + 1 < pages)
+
+
+async def list_pills(message: Message):
+    text, kb = render_list_page(message.from_user.id, 0)
+    if text is None:
+        await message.answer(strings.texts["list_empty"])
+        return
+
     await message.answer(
-        "📋 *Ваші пігулки:*\n\n" + "\n".join(lines),
+        text,
         parse_mode="Markdown",
+        reply_markup=kb,
     )
 
 
+async def list_page_callback(callback: CallbackQuery):
+    # page:list:<page>
+    page = int(callback.data.rsplit(":", 1)[1])
+    text, kb = render_list_page(callback.from_user.id, page)
+    if text is None:
+        await callback.answer(strings.texts["list_empty"])
+        return
+
+    await edit_page(callback, text, kb)
+
+
 # ---------- DELETE PILL ----------
 
 async def delete_pill_start(message: Message, state: FSMContext):
@@ -325,12 +324,15 @@ async def edit_days(message: Message, state: FSMContext):
 
 # ---------- REGISTER ----------
 
-def register_pill_handlers(dp: Dispatcher):
-    b = strings.buttons
+def button(key: str):
+    # looked up per update: every tenant has its own button captions
+    return lambda m: m.text == strings.buttons[key]
+
 
+def register_pill_handlers(dp: Dispatcher):
     # Add
     dp.message.register(add_pill_entry, Command("add"))
-    dp.message.register(add_pill_entry, F.text == b["add_pill"])
+    dp.message.register(add_pill_entry, button("add_pill"))
     dp.message.register(add_pill_name, AddPillStates.name)
     dp.message.register(add_pill_time, AddPillStates.time)
 
@@ -355,16 +357,20 @@ def register_pill_handlers(dp: Dispatcher):
 
     # List
     dp.message.register(list_pills, Command("list"))
-    dp.message.register(list_pills, F.text == b["my_pills"])
+    dp.message.register(list_pills, button("my_pills"))
+    dp.callback_query.register(
+        list_page_callback,
+        F.data.startswith("page:list:"),
+    )
 
     # Delete
     dp.message.register(delete_pill_start, Command("delete"))
-    dp.message.register(delete_pill_start, F.text == b["delete_pill"])
+    dp.message.register(delete_pill_start, button("delete_pill"))
     dp.message.register(delete_pill_choose, DeletePillStates.choose_id)
 
     # Edit
     dp.message.register(edit_pill_start, Command("edit"))
-    dp.message.register(edit_pill_start, F.text == b["edit_pill"])
+    dp.message.register(edit_pill_start, button("edit_pill"))
     dp.message.register(edit_choose_id, EditPillStates.choose_id)
     dp.message.register(edit_time, EditPillStates.time)
     dp.message.register(edit_days, EditPillStates.days)
@@ -1,135 +1,451 @@
 # handlers/reminders.py
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
 from zoneinfo import ZoneInfo
+import asyncio
+import functools
 import logging
+import sqlite3
 
 from aiogram import Dispatcher, F, Bot
+from aiogram.exceptions import TelegramAPIError
 from aiogram.types import CallbackQuery
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
+import clock
 from config import settings
 from strings import strings
+from journal import history_journal
 from keyboards import reminder_inline
+from dedupe import claim, is_stale, mark_sent, new_token, release
+from tenancy import current_tenant, get_tenant, tenant_for_bot
 from db import (
     get_reminders_for_time,
-    set_last_sent_today,
+    record_sent,
     insert_history,
     get_reminder_by_id,
 )
 
 
 logger = logging.getLogger(__name__)
-tz = ZoneInfo(settings.timezone)
-scheduler = AsyncIOScheduler(timezone=settings.timezone)
 
-# one global scheduler for whole app
-scheduler = AsyncIOScheduler(timezone=settings.timezone)
+# one global scheduler for whole app, built by get_scheduler()
+scheduler = None
 
+# ticks / snoozed sends currently running, waited for by drain()
+_in_flight = set()
+# minute of the last tick that ran to the end (see catch_up)
+last_tick: Optional[datetime] = None
+# held while one minute's reminders are read and sent
+_tick_lock = asyncio.Lock()
 
-async def check_reminders_job(bot: Bot):
+
+def local_tz() -> ZoneInfo:
+    # ZoneInfo caches instances per key, so this is a dict lookup
+    return ZoneInfo(settings.timezone)
+
+
+def get_scheduler():
+    global scheduler
+    if scheduler is None:
+        from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+        scheduler = AsyncIOScheduler(timezone=settings.timezone)
+    return scheduler
+
+
+def tracked(func):
+    """Registers the running coroutine in _in_flight so shutdown can drain it."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        task = asyncio.current_task()
+        _in_flight.add(task)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _in_flight.discard(task)
+
+    return wrapper
+
+
+@tracked
+async def check_reminders_job(bots: Dict[str, Bot], at: Optional[datetime] = None):
+    # one tick for every tenant: bots maps tenant name -> its Bot;
+    # `at` replays that one minute (see catch_up). The scheduled call
+    # also runs any minute since last_tick that a long tick made
+    # APScheduler skip (max_instances=1), up to catchup_minutes back.
     # час у таймзоні, де живеш ти і scheduler (Europe/Kyiv)
-    now = datetime.now(tz)
+    now = at or clock.now(local_tz())
+    minutes = [now]
+    if at is None and last_tick is not None:
+        skipped = _minutes_between(last_tick, now - timedelta(minutes=1), settings.catchup_minutes)
+        minutes = skipped + [now]
+        if len(minutes) > 1:
+            logger.warning(
+                "[check_reminders_job] catching up %d skipped minutes", len(minutes) - 1,
+            )
+    for minute in minutes:
+        # one minute at a time: a catch_up running next to the scheduled
+        # tick must not read rows the other is about to mark sent
+        async with _tick_lock:
+            await _run_minute(bots, minute)
+
+
+def _minutes_between(since: datetime, until: datetime, max_minutes: int) -> List[datetime]:
+    """Whole minutes after `since` up to `until`'s, at most the last `max_minutes` of them."""
+    tz = until.tzinfo
+    # step in UTC: real minutes, none invented or skipped around DST changes
+    until = until.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    minute = since.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+    minute = max(minute, until - timedelta(minutes=max_minutes))
+    minutes = []
+    while minute <= until:
+        minutes.append(minute.astimezone(tz))
+        minute += timedelta(minutes=1)
+    return minutes
+
+
+async def _run_minute(bots: Dict[str, Bot], now: datetime) -> None:
+    global last_tick
     today_str = now.date().isoformat()
     time_str = now.strftime("%H:%M")
     weekday = now.weekday()
 
     logger.info(
-        f"[check_reminders_job] now={now}, time_str={time_str}, weekday={weekday}")
+        "[check_reminders_job] tick",
+        extra={"fields": {"now": now, "time_str": time_str, "weekday": weekday}},
+    )
 
     rows = get_reminders_for_time(time_str)
     logger.info(
-        f"[check_reminders_job] found {len(rows)} reminders with time {time_str}")
+        "[check_reminders_job] found %d reminders with time %s",
+        len(rows), time_str,
+    )
 
-    if not rows:
-        return
+    # per-reminder lines are debug-only and sampled, so a big minute
+    # doesn't spend its time writing logs
+    debug = logger.isEnabledFor(logging.DEBUG)
+    due: Dict[str, list] = {}
 
     for r in rows:
-        logger.info(
-            f"[check_reminders_job] candidate id={r['id']} days={r['days']} last_sent_date={r['last_sent_date']}"
-        )
+        if debug:
+            logger.debug(
+                "[check_reminders_job] candidate",
+                extra={
+                    "sample_key": "check_reminders.candidate",
+                    "fields": {
+                        "id": r["id"],
+                        "days": r["days"],
+                        "last_sent_date": r["last_sent_date"],
+                    },
+                },
+            )
 
         if r["days"] != "daily":
             day_list = [int(x) for x in r["days"].split(",") if x]
             if weekday not in day_list:
-                logger.info(
-                    f"[check_reminders_job] skip id={r['id']} (weekday not in {day_list})")
+                if debug:
+                    logger.debug(
+                        "[check_reminders_job] skip: weekday not in days",
+                        extra={
+                            "sample_key": "check_reminders.skip",
+                            "fields": {"id": r["id"], "days": day_list},
+                        },
+                    )
                 continue
 
         if r["last_sent_date"] == today_str:
-            logger.info(
-                f"[check_reminders_job] skip id={r['id']} (already sent today)")
+            if debug:
+                logger.debug(
+                    "[check_reminders_job] skip: already sent today",
+                    extra={
+                        "sample_key": "check_reminders.skip",
+                        "fields": {"id": r["id"]},
+                    },
+                )
             continue
 
-        from random import choice
-        phrase_template = strings.reminder_phrases or ["Time to take {pill} 💊"]
-        text = choice(phrase_template).replace("{pill}", r["pill_name"])
+        if r["tenant"] not in bots:
+            logger.warning(
+                "[check_reminders_job] skip: unknown tenant",
+                extra={
+                    "sample_key": "check_reminders.tenant",
+                    "fields": {"id": r["id"], "tenant": r["tenant"]},
+                },
+            )
+            continue
+        due.setdefault(r["tenant"], []).append(r)
 
-        logger.info(
-            f"[check_reminders_job] sending to user={r['user_id']} pill={r['pill_name']}")
+    # every tenant sends within its own rate limit, side by side – one
+    # busy bot doesn't hold back the others' reminders
+    sent = await asyncio.gather(*(
+        _send_due(bots[name], name, tenant_rows, now, today_str, debug)
+        for name, tenant_rows in due.items()
+    ))
 
-        await bot.send_message(
-            chat_id=r["user_id"],
-            text=text,
-            reply_markup=reminder_inline(r["id"]),
-        )
+    last_tick = now if last_tick is None else max(last_tick, now)
+    logger.info(
+        "[check_reminders_job] sent %d of %d reminders", sum(sent), len(rows),
+    )
 
-        set_last_sent_today(r["id"])
-        insert_history(r["id"], now.isoformat(timespec="seconds"), "sent")
 
+async def _send_due(bot: Bot, tenant_name: str, rows: list, now: datetime,
+                    today_str: str, debug: bool) -> int:
+    # strings, keyboards and history below belong to this tenant
+    # (gather runs this in its own task, so the context is its own too)
+    current_tenant.set(tenant_name)
+    tenant = get_tenant(tenant_name)
+    phrase_template = strings.reminder_phrases or ["Time to take {pill} 💊"]
+    sent = 0
 
+    for r in rows:
+        from random import choice
+        text = choice(phrase_template).replace("{pill}", r["pill_name"])
+
+        if debug:
+            logger.debug(
+                "[check_reminders_job] sending",
+                extra={
+                    "sample_key": "check_reminders.send",
+                    "fields": {"user": r["user_id"], "pill": r["pill_name"]},
+                },
+            )
+
+        if tenant is not None:
+            await tenant.limiter.acquire()
+
+        token = new_token()
+        try:
+            await bot.send_message(
+                chat_id=r["user_id"],
+                text=text,
+                reply_markup=reminder_inline(r["id"], token),
+            )
+        except TelegramAPIError as e:
+            # one blocked user or API hiccup must not abort the whole tick
+            logger.warning(
+                "[check_reminders_job] send failed",
+                extra={"fields": {"id": r["id"], "user": r["user_id"], "error": e}},
+            )
+            continue
+
+        mark_sent(r["tenant"], r["id"], token)
+        sent += 1
+        try:
+            # off the loop: a long write lock (backfill, maintenance) makes
+            # this wait up to the busy timeout, other tenants keep sending
+            await asyncio.to_thread(
+                record_sent, r["id"], today_str, now.isoformat(timespec="seconds"), "sent",
+                r["tenant"],
+            )
+        except sqlite3.OperationalError as e:
+            # the message is out; losing its bookkeeping must not drop the
+            # rest of the minute
+            logger.error(
+                "[check_reminders_job] sent but not recorded",
+                extra={"fields": {"id": r["id"], "user": r["user_id"], "error": e}},
+            )
+    return sent
+
+
+async def catch_up(bots: Dict[str, Bot], since: datetime, max_minutes: int = 15):
+    """
+    Runs the ticks for the minutes after `since` up to now – the ones a
+    restart fell into. last_sent_date keeps anything already sent from
+    going out twice.
+    """
+    now = clock.now(local_tz()).replace(second=0, microsecond=0)
+    caught = 0
+    for minute in _minutes_between(since, now, max_minutes):
+        await check_reminders_job(bots, at=minute)
+        caught += 1
+    if caught:
+        logger.info("[catch_up] replayed %d missed minutes", caught)
+
+
+@tracked
 async def send_snoozed_reminder(bot: Bot, reminder_id: int):
     row = get_reminder_by_id(reminder_id)
     if not row:
         return
+    current_tenant.set(row["tenant"])
     from random import choice
     phrase_template = strings.reminder_phrases or ["Time to take {pill} 💊"]
     text = choice(phrase_template).replace("{pill}", row["pill_name"])
 
-    await bot.send_message(
-        chat_id=row["user_id"],
-        text=text + " (повторне нагадування) ⏰",
-        reply_markup=reminder_inline(reminder_id),
+    # snoozes share the tenant's send budget with the tick
+    tenant = get_tenant(row["tenant"])
+    if tenant is not None:
+        await tenant.limiter.acquire()
+
+    token = new_token()
+    try:
+        await bot.send_message(
+            chat_id=row["user_id"],
+            text=text + " (повторне нагадування) ⏰",
+            reply_markup=reminder_inline(reminder_id, token),
+        )
+    except TelegramAPIError as e:
+        logger.warning(
+            "[send_snoozed_reminder] send failed",
+            extra={"fields": {"id": reminder_id, "user": row["user_id"], "error": e}},
+        )
+        return
+    mark_sent(row["tenant"], reminder_id, token)
+    try:
+        await asyncio.to_thread(
+            insert_history, reminder_id,
+            clock.now(local_tz()).isoformat(timespec="seconds"), "snoozed_15", row["tenant"],
+        )
+    except sqlite3.OperationalError as e:
+        logger.error(
+            "[send_snoozed_reminder] sent but not recorded",
+            extra={"fields": {"id": reminder_id, "user": row["user_id"], "error": e}},
+        )
+
+
+def schedule_snooze(bot: Bot, reminder_id: int, run_date: datetime) -> None:
+    get_scheduler().add_job(
+        send_snoozed_reminder,
+        "date",
+        run_date=run_date,
+        args=(bot, reminder_id),
     )
-    insert_history(reminder_id, datetime.now(
-        tz).isoformat(timespec="seconds"), "snoozed_15")
+
+
+def pending_snoozes() -> List[dict]:
+    """Snoozed sends still waiting in the scheduler's memory store."""
+    pending = []
+    for job in get_scheduler().get_jobs():
+        if job.func is not send_snoozed_reminder or job.next_run_time is None:
+            continue
+        bot, reminder_id = job.args
+        pending.append({
+            "tenant": tenant_for_bot(bot.id),
+            "reminder_id": reminder_id,
+            "run_at": job.next_run_time.isoformat(),
+        })
+    return pending
+
+
+def restore_snoozes(bots: Dict[str, Bot], pending: List[dict], max_minutes: int = 15) -> int:
+    now = clock.now(local_tz())
+    oldest = now - timedelta(minutes=max_minutes)
+    restored = dropped = 0
+    for item in pending:
+        bot = bots.get(item["tenant"])
+        if bot is None:
+            continue
+        run_at = datetime.fromisoformat(item["run_at"])
+        if run_at < oldest:
+            # same cut-off as catch_up: after a long outage it's stale
+            dropped += 1
+            continue
+        # overdue ones go out right away rather than being dropped as misfires
+        schedule_snooze(bot, item["reminder_id"], max(run_at, now))
+        restored += 1
+    if dropped:
+        logger.info("[restore_snoozes] dropped %d snoozes overdue by over %d minutes",
+                    dropped, max_minutes)
+    return restored
+
+
+def sending() -> bool:
+    """A tick or a snoozed send is running right now."""
+    return bool(_in_flight)
+
+
+async def drain(timeout: float) -> int:
+    """
+    Waits up to `timeout` seconds for running ticks and snoozed sends,
+    then cancels the rest. Returns how many had to be cancelled.
+    """
+    pending = [t for t in _in_flight if t is not asyncio.current_task()]
+    if not pending:
+        return 0
+    _, still_running = await asyncio.wait(pending, timeout=timeout)
+    for task in still_running:
+        task.cancel()
+    if still_running:
+        await asyncio.wait(still_running)
+    return len(still_running)
+
+
+def _press_key(callback: CallbackQuery, reminder_id: int, token: Optional[str]) -> tuple:
+    if token is None:
+        # buttons sent before tokens existed: one press per message
+        token = f"m{callback.message.message_id}" if callback.message else callback.id
+    return current_tenant.get(), reminder_id, token
+
+
+async def _answered_before(callback: CallbackQuery, key: tuple, answer: str) -> bool:
+    """
+    Claims the press. A repeated or stale one is answered from memory
+    right here and True is returned – the caller must not touch the DB,
+    the scheduler or the message then.
+    """
+    tenant, reminder_id, token = key
+    if is_stale(tenant, reminder_id, token):
+        await callback.answer(strings.texts["stale_reminder"])
+        return True
+    earlier = claim(key, answer)
+    if earlier is not None:
+        await callback.answer(earlier)
+        return True
+    return False
 
 
 async def reminder_taken(callback: CallbackQuery):
-    _, id_str = callback.data.split(":", 1)
-    reminder_id = int(id_str)
+    # taken:<id>:<token>  (no token on messages sent by older versions)
+    parts = callback.data.split(":")
+    reminder_id = int(parts[1])
+    key = _press_key(callback, reminder_id, parts[2] if len(parts) > 2 else None)
 
-    insert_history(reminder_id, datetime.now(
-        tz).isoformat(timespec="seconds"), "taken")
-    await callback.answer(strings.texts["taken_ok"])
+    answer = strings.texts["taken_ok"]
+    if await _answered_before(callback, key, answer):
+        return
+
+    try:
+        # journaled, not yet in the DB – flushed in batches by history_journal
+        history_journal.add(
+            reminder_id,
+            clock.now(local_tz()).isoformat(timespec="seconds"),
+            "taken",
+        )
+    except Exception:
+        release(key)
+        raise
+    await callback.answer(answer)
     # прибираємо кнопки
     await callback.message.edit_reply_markup(reply_markup=None)
 
 
 async def reminder_snooze(callback: CallbackQuery, bot: Bot):
-    _, id_str, minutes_str = callback.data.split(":")
-    reminder_id = int(id_str)
-    minutes = int(minutes_str)
-
-    now_local = datetime.now(tz)
-
-    insert_history(
-        reminder_id,
-        now_local.isoformat(timespec="seconds"),
-        f"snooze_{minutes}",
-    )
+    # snooze:<id>:<minutes>:<token>
+    parts = callback.data.split(":")
+    reminder_id = int(parts[1])
+    minutes = int(parts[2])
+    key = _press_key(callback, reminder_id, parts[3] if len(parts) > 3 else None)
+
+    answer = strings.texts["snooze_ok"].format(minutes=minutes)
+    if await _answered_before(callback, key, answer):
+        return
 
-    run_date = now_local + timedelta(minutes=minutes)
-    scheduler.add_job(
-        send_snoozed_reminder,
-        "date",
-        run_date=run_date,
-        args=(bot, reminder_id),
-    )
+    now_local = clock.now(local_tz())
+    try:
+        history_journal.add(
+            reminder_id,
+            now_local.isoformat(timespec="seconds"),
+            f"snooze_{minutes}",
+        )
+        schedule_snooze(bot, reminder_id, now_local + timedelta(minutes=minutes))
+    except Exception:
+        release(key)
+        raise
 
+    await callback.answer(answer)
     # прибираємо кнопки з поточного повідомлення
     await callback.message.edit_reply_markup(reply_markup=None)
-    await callback.answer(strings.texts["snooze_ok"].format(minutes=minutes))
-
 
 
 async def reminder_snooze_handler(callback: CallbackQuery, bot: Bot):
@@ -148,12 +464,13 @@ def register_reminder_handlers(dp: Dispatcher):
     )
 
 
-async def setup_scheduler(bot: Bot):
+async def setup_scheduler(bots: Dict[str, Bot]):
+    scheduler = get_scheduler()
     scheduler.add_job(
         check_reminders_job,
         "interval",
         minutes=1,
-        args=(bot,),
+        args=(bots,),
         id="check_reminders",
         replace_existing=True,
     )
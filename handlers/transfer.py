@@ -0,0 +1,121 @@
+# handlers/transfer.py
+import asyncio
+import os
+import tempfile
+
+from aiogram import Bot, Dispatcher
+from aiogram.filters import Command, CommandObject
+from aiogram.fsm.context import FSMContext
+from aiogram.types import FSInputFile, Message
+
+from config import settings
+from strings import strings
+from keyboards import main_keyboard, back_keyboard
+from states import ImportStates
+from journal import history_journal
+from tenancy import current_tenant
+from transfer import FORMATS, KINDS, export_to_file, guess_format, import_file
+
+# Bot API refuses to hand out bigger files anyway
+MAX_IMPORT_BYTES = 20 * 1024 * 1024
+ERRORS_SHOWN = 5
+
+
+# ---------- EXPORT ----------
+
+async def cmd_export(message: Message, command: CommandObject):
+    # /export [reminders|history] [csv|jsonl]
+    kind, fmt = "reminders", "csv"
+    for arg in (command.args or "").lower().split():
+        if arg in KINDS:
+            kind = arg
+        elif arg in FORMATS:
+            fmt = arg
+        else:
+            await message.answer(strings.texts["export_usage"], parse_mode="Markdown")
+            return
+
+    if kind == "history":
+        await history_journal.flush()
+
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        # streamed straight from the cursor into the file, off the event loop
+        count = await asyncio.to_thread(
+            export_to_file, path, kind, fmt, message.from_user.id, current_tenant.get()
+        )
+        if not count:
+            await message.answer(strings.texts["export_empty"])
+            return
+        await message.answer_document(FSInputFile(path, filename=f"{kind}.{fmt}"))
+    finally:
+        os.remove(path)
+
+
+# ---------- IMPORT ----------
+
+async def cmd_import(message: Message, state: FSMContext, bot: Bot):
+    # the file may come right away as a document captioned /import
+    # (Command matches captions too)
+    if message.document:
+        await import_document(message, state, bot)
+        return
+
+    await state.set_state(ImportStates.file)
+    await message.answer(
+        strings.texts["import_ask_file"],
+        parse_mode="Markdown",
+        reply_markup=back_keyboard(),
+    )
+
+
+async def import_document(message: Message, state: FSMContext, bot: Bot):
+    document = message.document
+    if not document:
+        await message.answer(strings.texts["import_need_file"])
+        return
+    if document.file_size and document.file_size > MAX_IMPORT_BYTES:
+        await message.answer(strings.texts["import_too_big"])
+        return
+
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        await bot.download(document, destination=path)
+        report = await asyncio.to_thread(
+            import_file,
+            path,
+            "reminders",
+            message.from_user.id,
+            current_tenant.get(),
+            guess_format(document.file_name),
+            settings.max_reminders_per_user,
+        )
+    finally:
+        os.remove(path)
+
+    await state.clear()
+    lines = [
+        strings.texts["import_done"].format(
+            imported=report.imported,
+            rejected=report.rejected,
+        )
+    ]
+    for line_no, error in report.errors[:ERRORS_SHOWN]:
+        lines.append(strings.texts["import_error_line"].format(line=line_no, error=error))
+    # errors quote user input, so no Markdown here
+    await message.answer(
+        "\n".join(lines),
+        parse_mode=None,
+        reply_markup=main_keyboard(),
+    )
+
+
+# ---------- REGISTER ----------
+
+def register_transfer_handlers(dp: Dispatcher):
+    dp.message.register(cmd_export, Command("export"))
+
+    dp.message.register(cmd_import, Command("import"))
+    dp.message.register(import_document, ImportStates.file)
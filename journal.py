@@ -0,0 +1,196 @@
+# journal.py
+"""
+Write-behind buffer for history events coming from button presses.
+
+add() appends the event to an append-only journal file and keeps it in
+memory; flush() writes everything buffered to SQLite in one transaction,
+in a worker thread so the event loop keeps serving presses, and then
+drops the written events from the journal. On startup open() replays
+whatever a crashed process left in the journal, so an event is never
+lost once add() has returned. A crash between the DB commit and the truncate can
+replay a batch twice – history is at-least-once, never lossy.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+from config import settings
+from db import insert_history_many
+from tenancy import DEFAULT_TENANT, current_tenant
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[int, str, str, str]  # (reminder_id, sent_at, action, tenant)
+
+
+class HistoryJournal:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        flush_interval: float = 1.0,
+        max_batch: int = 500,
+        fsync: bool = False,
+    ):
+        # path=None: settings.journal_path, looked up in open()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        # fsync every append: survives power loss, not just a process crash
+        self.fsync = fsync
+
+        self._file = None
+        self._buffer: List[Event] = []
+        self._oldest: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._failing = False
+        self._kick: Optional[asyncio.Task] = None
+
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def open(self) -> int:
+        """Replay leftovers of a previous process into the DB. Returns how many."""
+        if self.path is None:
+            self.path = settings.journal_path
+        replayed = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        # torn last line of a crashed write – never acknowledged
+                        continue
+                    if len(event) == 3:
+                        # written before multi-bot support
+                        event.append(DEFAULT_TENANT)
+                    replayed.append(tuple(event))
+
+        if replayed:
+            insert_history_many(replayed)
+            logger.info("[journal] replayed %d history events", len(replayed))
+
+        self._file = open(self.path, "w", encoding="utf-8")
+        return len(replayed)
+
+    def add(self, reminder_id: int, sent_at: str, action: str) -> None:
+        event = (reminder_id, sent_at, action, current_tenant.get())
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        self._buffer.append(event)
+        # after a failed flush only run() retries, on its interval –
+        # not every press once the buffer is over max_batch
+        if len(self._buffer) >= self.max_batch and not self._failing and not self._lock.locked():
+            self._kick = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> int:
+        # one flush at a time; a caller arriving mid-flush waits for it
+        # and then writes whatever came in meanwhile
+        async with self._lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        if not self._buffer:
+            return 0
+
+        started = time.perf_counter()
+        batch = self._buffer
+        # presses keep arriving while the batch is written off the loop
+        self._buffer = []
+        write = asyncio.ensure_future(asyncio.to_thread(insert_history_many, batch))
+        cancelled = False
+        try:
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                # shutdown cancelled run() mid-write; the thread commits
+                # anyway, so wait for it and count the batch as written –
+                # putting it back would make close() write it twice
+                cancelled = True
+                await write
+        except Exception:
+            # keep the batch (and the journal) for the next attempt
+            self._buffer = batch + self._buffer
+            self._failing = True
+            self.failed_flushes += 1
+            logger.exception("[journal] flush of %d events failed", len(batch))
+            if cancelled:
+                raise asyncio.CancelledError
+            return 0
+        self._failing = False
+        self._rewrite()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushed_total += len(batch)
+        self.flush_count += 1
+        self.last_flush_ms = round(elapsed_ms, 2)
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+        logger.debug(
+            "[journal] flushed",
+            extra={"fields": {"events": len(batch), "ms": self.last_flush_ms}},
+        )
+        if cancelled:
+            raise asyncio.CancelledError
+        return len(batch)
+
+    def _rewrite(self) -> None:
+        """Leaves only the events added during the flush in the journal."""
+        if not self._buffer:
+            self._file.seek(0)
+            self._file.truncate()
+            self._oldest = None
+            return
+        # never truncate in place here: those events are already acknowledged
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for event in self._buffer:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        # close enough: the first of them came in during the flush
+        self._oldest = time.monotonic()
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._file is None:
+            return
+        # if this fails too, the journal is replayed by the next open()
+        await self.flush()
+        self._file.close()
+        self._file = None
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._oldest if self._oldest is not None else 0.0
+        return {
+            "backlog": len(self._buffer),
+            "oldest_pending_s": round(age, 3),
+            "flushed_total": self.flushed_total,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "failing": self._failing,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+# configured from settings in bootstrap.bootstrap
+history_journal = HistoryJournal()
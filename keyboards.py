@@ -1,5 +1,5 @@
 # keyboards.py
-from typing import Set
+from typing import Optional, Set
 
 from aiogram.types import (
     ReplyKeyboardMarkup,
@@ -96,23 +96,51 @@ def days_select_keyboard(selected: Set[int]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def reminder_inline(reminder_id: int) -> InlineKeyboardMarkup:
+def reminder_inline(reminder_id: int, token: str) -> InlineKeyboardMarkup:
+    # token: one per sent message, see dedupe.py
     b = strings.buttons
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
                     text=b["pill_taken"],
-                    callback_data=f"taken:{reminder_id}",
+                    callback_data=f"taken:{reminder_id}:{token}",
                 ),
                 InlineKeyboardButton(
                     text=b["remind_later_15"],
-                    callback_data=f"snooze:{reminder_id}:15",
+                    callback_data=f"snooze:{reminder_id}:15:{token}",
                 ),
             ]
         ]
     )
 
+
+def pager_inline(kind: str, page: int, has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    """
+    ◀️ / ▶️ buttons for paginated lists; page is 0-based.
+    callback_data: 'page:<kind>:<page>'. None when there is only one page.
+    """
+    b = strings.buttons
+    row = []
+    if page > 0:
+        row.append(
+            InlineKeyboardButton(
+                text=b["page_prev"],
+                callback_data=f"page:{kind}:{page - 1}",
+            )
+        )
+    if has_next:
+        row.append(
+            InlineKeyboardButton(
+                text=b["page_next"],
+                callback_data=f"page:{kind}:{page + 1}",
+            )
+        )
+    if not row:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[row])
+
+
 def back_keyboard() -> ReplyKeyboardMarkup:
     b = strings.buttons
     return ReplyKeyboardMarkup(
@@ -0,0 +1,35 @@
+# lazy.py
+from typing import Any, Callable
+
+
+class LazyObject:
+    """
+    Stand-in that builds the real object on first attribute access.
+    Lets modules keep `from config import settings` without reading
+    .env (or files) at import time.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_wrapped", None)
+
+    def _resolve(self) -> Any:
+        wrapped = object.__getattribute__(self, "_wrapped")
+        if wrapped is None:
+            wrapped = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_wrapped", wrapped)
+        return wrapped
+
+    def _reset(self, value: Any = None) -> None:
+        """Drop (or replace) the built object; the next access rebuilds it."""
+        object.__setattr__(self, "_wrapped", value)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        wrapped = object.__getattribute__(self, "_wrapped")
+        return f"<lazy {wrapped!r}>" if wrapped is not None else "<lazy, not built yet>"
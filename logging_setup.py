@@ -0,0 +1,113 @@
+# logging_setup.py
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Dict, Optional, Tuple
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Appends structured fields passed as `extra={"fields": {...}}`
+    to the end of the line as key=value pairs.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts the raw record on the queue. The stock QueueHandler formats the
+    message in the calling thread – here that would be the event loop,
+    so formatting is left to the listener thread instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `burst` records per `sample_key` every `period`
+    seconds. Records without `extra={"sample_key": ...}` are not limited.
+    When a window closes, the next record of that key reports how many
+    were dropped (`suppressed=N`).
+    """
+
+    def __init__(self, burst: int = 20, period: float = 60.0):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        # sample_key -> (window_start, passed, dropped)
+        self._windows: Dict[str, Tuple[float, int, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None:
+            return True
+
+        now = time.monotonic()
+        start, passed, dropped = self._windows.get(key, (now, 0, 0))
+        if now - start >= self.period:
+            if dropped:
+                fields = dict(getattr(record, "fields", None) or {})
+                fields["suppressed"] = dropped
+                record.fields = fields
+            start, passed, dropped = now, 0, 0
+
+        if passed >= self.burst:
+            self._windows[key] = (start, passed, dropped + 1)
+            return False
+
+        self._windows[key] = (start, passed + 1, dropped)
+        return True
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    sample_burst: int = 20,
+    sample_period: float = 60.0,
+) -> logging.handlers.QueueListener:
+    """
+    Route every log record through an in-memory queue to a background
+    listener thread that does the formatting and the actual writing.
+    Call stop_logging() on shutdown to flush what is still queued.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(sample_burst, sample_period))
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+    return _listener
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
@@ -0,0 +1,253 @@
+# middlewares.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from strings import strings
+from tenancy import current_tenant, tenant_for_bot
+
+logger = logging.getLogger(__name__)
+
+# lower number = served first
+PRIORITY_ACK = 0      # "taken:" / "snooze:" presses on a reminder
+PRIORITY_NORMAL = 1   # dialogs, edits, everything else
+PRIORITY_READ = 2     # read-only views, first to be shed
+
+ACK_PREFIXES = ("taken:", "snooze:")
+READ_COMMANDS = ("/list", "/history", "/export")
+READ_BUTTONS = ("my_pills", "history")
+READ_CALLBACK_PREFIXES = ("page:",)
+
+
+def classify(update: Update) -> int:
+    if update.callback_query is not None:
+        data = update.callback_query.data or ""
+        if data.startswith(ACK_PREFIXES):
+            return PRIORITY_ACK
+        if data.startswith(READ_CALLBACK_PREFIXES):
+            return PRIORITY_READ
+        return PRIORITY_NORMAL
+
+    message = update.message
+    if message is not None and message.text:
+        command = message.text.split(maxsplit=1)[0].split("@", 1)[0].lower()
+        if command in READ_COMMANDS:
+            return PRIORITY_READ
+        if message.text in (strings.buttons[b] for b in READ_BUTTONS):
+            return PRIORITY_READ
+    return PRIORITY_NORMAL
+
+
+def _user_id(update: Update) -> Optional[int]:
+    event = update.callback_query or update.message or update.edited_message
+    user = getattr(event, "from_user", None)
+    return user.id if user else None
+
+
+class PriorityGate:
+    """
+    Counting semaphore that hands free slots to waiters by priority
+    (then arrival order) instead of plain FIFO.
+
+    Waiters that gave up (timeout, cancel) are only marked done and
+    dropped lazily – from the heap when release() pops them, from the
+    arrival queue when they reach its head – so queued() and
+    oldest_wait() are O(1) amortized on every update.
+    """
+
+    # rebuild the heap once this many given-up waiters make up half of it
+    COMPACT_AFTER = 64
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters = []  # (priority, seq, enqueued_at, future)
+        self._arrivals = deque()  # (enqueued_at, future), oldest first
+        self._seq = itertools.count()
+        self._queued = 0  # live waiters
+        self._dead = 0    # given-up waiters still in the heap
+
+    def queued(self) -> int:
+        return self._queued
+
+    def oldest_wait(self) -> float:
+        """Seconds the longest-waiting request has been queued."""
+        while self._arrivals and self._arrivals[0][1].done():
+            self._arrivals.popleft()
+        if not self._arrivals:
+            return 0.0
+        return time.monotonic() - self._arrivals[0][0]
+
+    async def acquire(self, priority: int, timeout: Optional[float] = None) -> bool:
+        if self.active < self.limit and not self._queued:
+            self.active += 1
+            return True
+
+        fut = asyncio.get_running_loop().create_future()
+        now = time.monotonic()
+        heapq.heappush(self._waiters, (priority, next(self._seq), now, fut))
+        self._arrivals.append((now, fut))
+        self._queued += 1
+        try:
+            # release() hands the slot over by resolving the future
+            return await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError:
+            if fut.done():
+                # the slot arrived in the same tick the timeout fired
+                return True
+            self._give_up(fut)
+            return False
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            elif not fut.done():
+                self._give_up(fut)
+            raise
+
+    def _give_up(self, fut: asyncio.Future) -> None:
+        fut.cancel()
+        self._queued -= 1
+        self._dead += 1
+        if self._dead > self.COMPACT_AFTER and self._dead * 2 > len(self._waiters):
+            self._waiters = [w for w in self._waiters if not w[-1].done()]
+            heapq.heapify(self._waiters)
+            self._arrivals = deque(a for a in self._arrivals if not a[1].done())
+            self._dead = 0
+
+    def release(self) -> None:
+        while self._waiters:
+            *_, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                self._dead -= 1
+                continue
+            fut.set_result(True)
+            self._queued -= 1
+            return
+        self.active -= 1
+
+
+class TenantMiddleware(BaseMiddleware):
+    """
+    Outer update middleware: marks which tenant's bot received the update,
+    so strings, keyboards and DB helpers below work on that tenant's data.
+    Registered before PriorityMiddleware, whose shed replies are localized.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        token = current_tenant.set(tenant_for_bot(data["bot"].id))
+        try:
+            return await handler(event, data)
+        finally:
+            current_tenant.reset(token)
+
+
+class PriorityMiddleware(BaseMiddleware):
+    """
+    Outer update middleware: caps in-flight handlers per user and overall,
+    serves "taken"/"snooze" presses ahead of everything else and sheds
+    read-only requests with a friendly reply when the queue gets slow.
+    """
+
+    def __init__(self, max_in_flight: int = 64, per_user: int = 2, shed_after: float = 2.0):
+        self.gate = PriorityGate(max_in_flight)
+        self.per_user = per_user
+        self.shed_after = shed_after
+        # keyed by (tenant, user id): the same person may use two of the bots
+        self._user_gates: Dict[tuple, PriorityGate] = {}
+
+        self.processed = [0, 0, 0]
+        self.shed = 0
+        self.max_wait = 0.0
+
+    async def _shed(self, update: Update) -> None:
+        self.shed += 1
+        text = strings.texts["busy"]
+        try:
+            if update.callback_query is not None:
+                await update.callback_query.answer(text)
+            elif update.message is not None:
+                await update.message.answer(text)
+        except Exception:
+            logger.exception("[priority] failed to answer a shed update")
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        priority = classify(event)
+        user_id = _user_id(event)
+        user_key = (current_tenant.get(), user_id)
+        timeout = self.shed_after if priority == PRIORITY_READ else None
+
+        # the queue is already slower than we promise – don't even wait
+        if timeout is not None and self.gate.oldest_wait() > self.shed_after:
+            await self._shed(event)
+            return None
+
+        user_gate = None
+        if user_id is not None:
+            user_gate = self._user_gates.get(user_key)
+            if user_gate is None:
+                user_gate = self._user_gates[user_key] = PriorityGate(self.per_user)
+
+        started = time.monotonic()
+        try:
+            if user_gate is not None and not await user_gate.acquire(priority, timeout):
+                await self._shed(event)
+                return None
+            try:
+                left = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+                if not await self.gate.acquire(priority, left):
+                    await self._shed(event)
+                    return None
+
+                self.max_wait = max(self.max_wait, time.monotonic() - started)
+                self.processed[priority] += 1
+                try:
+                    return await handler(event, data)
+                finally:
+                    self.gate.release()
+            finally:
+                if user_gate is not None:
+                    user_gate.release()
+        finally:
+            if user_gate is not None and not user_gate.active and not user_gate.queued():
+                self._user_gates.pop(user_key, None)
+
+    async def drain(self, timeout: float) -> bool:
+        """Waits until no handler is running or queued. False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self.gate.active or self.gate.queued():
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.gate.active,
+            "queued": self.gate.queued(),
+            "oldest_wait_s": round(self.gate.oldest_wait(), 3),
+            "max_wait_s": round(self.max_wait, 3),
+            "processed": {
+                "ack": self.processed[PRIORITY_ACK],
+                "normal": self.processed[PRIORITY_NORMAL],
+                "read": self.processed[PRIORITY_READ],
+            },
+            "shed": self.shed,
+            "users": len(self._user_gates),
+        }
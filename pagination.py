@@ -0,0 +1,49 @@
+# pagination.py
+from typing import List
+
+# Telegram rejects messages longer than this many UTF-16 code units
+TELEGRAM_LIMIT = 4096
+
+# pill names typed in chat have no length limit; on a page they are cut
+# to this, so a single line can never fill a page on its own
+MAX_NAME_SHOWN = 120
+
+
+def shorten(text: str, width: int = MAX_NAME_SHOWN) -> str:
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+
+def utf16_len(text: str) -> int:
+    # what Telegram counts: emoji and other astral characters take two
+    return len(text.encode("utf-16-le")) // 2
+
+
+def page_starts(header: str, lines: List[str], page_size: int, footer_room: int = 0) -> List[int]:
+    """
+    Index of the first line of every page. A page takes up to `page_size`
+    lines, fewer when the next one would push it over TELEGRAM_LIMIT – that
+    line opens the next page instead, so nothing is cut or skipped.
+    `footer_room` is kept free for the footer.
+    """
+    budget = TELEGRAM_LIMIT - utf16_len(header) - len("\n\n") - footer_room
+    starts = [0]
+    used = count = 0
+    for i, line in enumerate(lines):
+        size = utf16_len(line) + 1  # with its newline
+        if count and (count == page_size or used + size > budget):
+            starts.append(i)
+            used = count = 0
+        used += size
+        count += 1
+    return starts
+
+
+def footer_room(template: str) -> int:
+    """Room for a footer rendered from `template`, with the widest page numbers."""
+    return utf16_len(template.format(page=99999, pages=99999)) + len("\n\n")
+
+
+def render_page(header: str, lines: List[str], footer: str = "") -> str:
+    """Build one page message from lines chosen with page_starts."""
+    tail = f"\n\n{footer}" if footer else ""
+    return header + "\n\n" + "\n".join(lines) + tail
@@ -0,0 +1,48 @@
+# ratelimit.py
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket for outgoing API calls: on average `rate` calls per
+    second, with bursts of up to `burst`. acquire() waits for a token,
+    and for the end of a pause() (Telegram's flood control).
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+        self.waited = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """No tokens for anyone for `seconds`."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        # the lock keeps waiters in arrival order
+        async with self._lock:
+            paused = self._paused_until - time.monotonic()
+            if paused > 0:
+                self.waited += paused
+                await asyncio.sleep(paused)
+                # nothing accrues while paused
+                self._tokens = 0.0
+                self._updated = time.monotonic()
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self._tokens -= 1
@@ -0,0 +1,115 @@
+# snapshot.py
+"""
+Warm-restart state handed from a stopping process to the next one.
+
+On shutdown the bot writes pending snoozes (they only live in the
+scheduler's memory store), the minute of the last finished tick, the
+live part of the reminder cache and the button-press dedupe state. The
+next process loads the file once, re-schedules the snoozes, replays the
+ticks it missed in between and starts with warm caches instead of
+reloading every user from the DB or accepting repeated presses.
+A missing or unreadable snapshot just means a cold start. The cached
+lists are dropped if reminders were written to while no bot was
+running (transfer CLI, a manual fix).
+"""
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from aiogram import Bot
+
+from cache import TTLCache
+from config import settings
+from db import reminders_cache, reminders_version
+import dedupe
+import handlers.reminders as reminders
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+
+# snapshot key -> cache; keys are tuples, stored as JSON lists
+CACHES = {
+    "cache": reminders_cache,
+    "handled": dedupe.handled,
+    "latest": dedupe.latest,
+}
+
+
+def _dump(cache: TTLCache) -> list:
+    return [[list(key), value, ttl] for key, value, ttl in cache.dump()]
+
+
+def _load(cache: TTLCache, entries: list, age: float) -> int:
+    return cache.load((tuple(key), value, ttl - age) for key, value, ttl in entries)
+
+
+def save_snapshot(path: Optional[str] = None) -> dict:
+    path = path or settings.snapshot_path
+    data = {
+        "version": SNAPSHOT_VERSION,
+        "written_at": time.time(),
+        "last_tick": reminders.last_tick.isoformat() if reminders.last_tick else None,
+        "snoozes": reminders.pending_snoozes(),
+        "reminders_version": reminders_version(),
+    }
+    for name, cache in CACHES.items():
+        data[name] = _dump(cache)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    # never leave a half-written snapshot behind
+    os.replace(tmp, path)
+    logger.info(
+        "[snapshot] saved",
+        extra={"fields": {
+            "snoozes": len(data["snoozes"]),
+            **{name: len(data[name]) for name in CACHES},
+        }},
+    )
+    return data
+
+
+def load_snapshot(path: Optional[str] = None) -> Optional[dict]:
+    """Reads and removes the snapshot; it is only good for one start."""
+    path = path or settings.snapshot_path
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logger.warning("[snapshot] %s is unreadable, starting cold", path)
+        data = None
+    os.remove(path)
+
+    if data is not None and data.get("version") != SNAPSHOT_VERSION:
+        logger.warning("[snapshot] unknown version %r, starting cold", data.get("version"))
+        return None
+    return data
+
+
+def restore_snapshot(bots: Dict[str, Bot], path: Optional[str] = None) -> Optional[datetime]:
+    """
+    Re-schedules pending snoozes and warms the caches. Returns the last
+    finished tick, for handlers.reminders.catch_up, or None.
+    """
+    data = load_snapshot(path)
+    if data is None:
+        return None
+
+    # TTLs kept counting while no process was running
+    age = max(0.0, time.time() - data["written_at"])
+    if data["reminders_version"] != reminders_version():
+        logger.info("[snapshot] reminders changed since the snapshot, dropping cached lists")
+        data["cache"] = []
+    loaded = {name: _load(cache, data.get(name, []), age) for name, cache in CACHES.items()}
+    snoozes = reminders.restore_snoozes(bots, data["snoozes"], settings.catchup_minutes)
+    logger.info(
+        "[snapshot] restored",
+        extra={"fields": {"snoozes": snoozes, **loaded, "age_s": round(age, 1)}},
+    )
+    return datetime.fromisoformat(data["last_tick"]) if data["last_tick"] else None
@@ -17,3 +17,7 @@ class EditPillStates(StatesGroup):
 
 class DeletePillStates(StatesGroup):
     choose_id = State()
+
+
+class ImportStates(StatesGroup):
+    file = State()
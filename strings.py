@@ -3,6 +3,7 @@ import json
 from dataclasses import dataclass
 from typing import Dict, List
 from config import settings
+from tenancy import current_tenant, get_tenant
 
 
 @dataclass
@@ -23,4 +24,27 @@ def load_strings(path: str = None) -> Strings:
     )
 
 
-strings = load_strings()
+# strings_path -> Strings, each file read on first use
+_loaded: Dict[str, Strings] = {}
+
+
+def get_strings(tenant_name: str) -> Strings:
+    tenant = get_tenant(tenant_name)
+    path = tenant.strings_path if tenant else settings.strings_path
+    loaded = _loaded.get(path)
+    if loaded is None:
+        loaded = _loaded[path] = load_strings(path)
+    return loaded
+
+
+class _TenantStrings:
+    """`strings` as seen by the tenant whose update (or reminder) is being handled."""
+
+    def __getattr__(self, name):
+        return getattr(get_strings(current_tenant.get()), name)
+
+    def __repr__(self) -> str:
+        return f"<strings of {current_tenant.get()!r}>"
+
+
+strings = _TenantStrings()
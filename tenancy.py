@@ -0,0 +1,104 @@
+# tenancy.py
+"""
+Several branded bots in one process. Each tenant has its own token,
+strings.json and send rate; the DB, caches and the reminder tick are
+shared, with a `tenant` column telling the rows apart.
+
+The tenant of the update being handled lives in `current_tenant`; the
+TenantMiddleware sets it from the bot that received the update, and the
+tick sets it per reminder.
+"""
+import json
+import os
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config import require_bot_token, settings
+from ratelimit import RateLimiter
+
+DEFAULT_TENANT = "default"
+
+# messages/s Telegram allows one bot overall; a tenant's rate_limit and
+# the broadcast rate share it
+TELEGRAM_RATE = 30.0
+
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+
+@dataclass
+class Tenant:
+    name: str
+    bot_token: str
+    strings_path: str = "strings.json"
+    # reminders and snoozes; BROADCAST_RATE comes on top (see TELEGRAM_RATE)
+    rate_limit: float = 25.0
+    limiter: RateLimiter = field(init=False, repr=False)
+    # shared by all of this tenant's broadcasts, however many run at once
+    broadcast_limiter: RateLimiter = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.limiter = RateLimiter(self.rate_limit, burst=int(self.rate_limit))
+        self.broadcast_limiter = RateLimiter(
+            settings.broadcast_rate, burst=settings.broadcast_concurrency,
+        )
+
+    @property
+    def bot_id(self) -> int:
+        # the numeric part of the token is the bot's user id
+        return int(self.bot_token.split(":", 1)[0])
+
+
+# name -> Tenant, filled by load_tenants()
+tenants: Dict[str, Tenant] = {}
+# bot id -> tenant name
+_by_bot_id: Dict[int, str] = {}
+
+
+def load_tenants(path: Optional[str] = None) -> List[Tenant]:
+    """
+    TENANTS_FILE is a JSON list like
+        [{"name": "tinusi", "bot_token_env": "TINUSI_TOKEN",
+          "strings_path": "strings.json", "rate_limit": 25}]
+    ("bot_token" may be given inline instead of "bot_token_env").
+    Without it there is a single "default" tenant from BOT_TOKEN.
+    """
+    path = path or settings.tenants_file
+    if not path:
+        loaded = [Tenant(DEFAULT_TENANT, require_bot_token(), settings.strings_path)]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        loaded = []
+        for item in data:
+            token = item.get("bot_token") or os.getenv(item.get("bot_token_env", ""), "")
+            if not token:
+                raise RuntimeError(f"tenant {item['name']!r} has no bot token")
+            loaded.append(Tenant(
+                name=item["name"],
+                bot_token=token,
+                strings_path=item.get("strings_path", settings.strings_path),
+                rate_limit=float(item.get("rate_limit", 25.0)),
+            ))
+
+    tenants.clear()
+    _by_bot_id.clear()
+    for tenant in loaded:
+        if tenant.name in tenants:
+            raise RuntimeError(f"duplicate tenant {tenant.name!r}")
+        if tenant.rate_limit + settings.broadcast_rate > TELEGRAM_RATE:
+            raise RuntimeError(
+                f"tenant {tenant.name!r}: rate_limit {tenant.rate_limit:g} + BROADCAST_RATE "
+                f"{settings.broadcast_rate:g} is over Telegram's {TELEGRAM_RATE:g} messages/s"
+            )
+        tenants[tenant.name] = tenant
+        _by_bot_id[tenant.bot_id] = tenant.name
+    return loaded
+
+
+def tenant_for_bot(bot_id: int) -> str:
+    return _by_bot_id.get(bot_id, DEFAULT_TENANT)
+
+
+def get_tenant(name: str) -> Optional[Tenant]:
+    return tenants.get(name)
@@ -0,0 +1,262 @@
+# transfer.py
+"""
+Streaming import / export of reminders and history as CSV or JSON Lines.
+
+Everything is generator based: rows go from the cursor to the output one
+batch at a time, and imports are written in chunked executemany
+transactions, so the size of the table doesn't matter.
+
+    python transfer.py export reminders --format csv > pills.csv
+    python transfer.py export history --user 123 --format jsonl -o history.jsonl
+    python transfer.py import reminders --user 123 pills.csv
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tenancy import DEFAULT_TENANT
+from db import (
+    create_reminders_many,
+    get_reminder_ids,
+    insert_history_many,
+    iter_history,
+    init_db,
+    iter_reminders,
+)
+from validators import normalize_days, normalize_time
+
+FORMATS = ("csv", "jsonl")
+KINDS = ("reminders", "history")
+
+FIELDS = {
+    "reminders": ("id", "user_id", "pill_name", "time_str", "days"),
+    "history": ("reminder_id", "user_id", "pill_name", "sent_at", "action"),
+}
+
+CHUNK_SIZE = 1000
+MAX_PILL_NAME = 200
+# errors kept for the report; the rest are only counted
+MAX_ERRORS = 20
+
+
+def guess_format(filename: str) -> str:
+    name = (filename or "").lower()
+    return "jsonl" if name.endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+# ---------- export ----------
+
+def dump_rows(rows: Iterable, fields: Tuple[str, ...], fmt: str) -> Iterator[str]:
+    """Yields the file line by line (csv starts with a header)."""
+    if fmt == "jsonl":
+        for r in rows:
+            yield json.dumps({f: r[f] for f in fields}, ensure_ascii=False) + "\n"
+        return
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def take() -> str:
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return line
+
+    writer.writerow(fields)
+    yield take()
+    for r in rows:
+        writer.writerow([r[f] for f in fields])
+        yield take()
+
+
+def export_lines(kind: str, fmt: str, user_id: Optional[int] = None,
+                 tenant: Optional[str] = None) -> Iterator[str]:
+    source = iter_reminders if kind == "reminders" else iter_history
+    return dump_rows(source(user_id, tenant), FIELDS[kind], fmt)
+
+
+def export_to_file(path: str, kind: str, fmt: str, user_id: Optional[int] = None,
+                   tenant: Optional[str] = None) -> int:
+    """Streams an export into `path`. Returns the number of data rows."""
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for line in export_lines(kind, fmt, user_id, tenant):
+            f.write(line)
+            count += 1
+    return count - 1 if fmt == "csv" else count
+
+
+# ---------- import ----------
+
+def load_rows(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Dict]]:
+    """Yields (line_no, row dict). Undecodable JSON lines become {"_error": ...}."""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {"_error": f"bad JSON: {e}"}
+            if not isinstance(row, dict):
+                row = {"_error": "expected a JSON object"}
+            yield line_no, row
+        return
+
+    reader = csv.DictReader(lines)
+    for row in reader:
+        if None in row:
+            row = {"_error": 'too many columns – quote lists like "0,2,4"'}
+        yield reader.line_num, row
+
+
+def validate_reminder(row: Dict) -> Tuple[str, str, str]:
+    """Returns (pill_name, time_str, days) in DB format or raises ValueError."""
+    if "_error" in row:
+        raise ValueError(row["_error"])
+
+    pill_name = str(row.get("pill_name") or "").strip()
+    if not pill_name:
+        raise ValueError("pill_name is empty")
+    if len(pill_name) > MAX_PILL_NAME:
+        raise ValueError("pill_name is too long")
+
+    time_str = normalize_time(str(row.get("time_str") or ""))
+    if time_str is None:
+        raise ValueError(f"bad time_str {row.get('time_str')!r}, expected HH:MM")
+
+    days = normalize_days(str(row.get("days") or ""))
+    if days is None:
+        raise ValueError(f"bad days {row.get('days')!r}, expected daily, mon,wed or 0,2")
+
+    return pill_name, time_str, days
+
+
+def validate_history(row: Dict, reminder_ids: set, tenant: str) -> Tuple[int, str, str, str]:
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    try:
+        reminder_id = int(row.get("reminder_id"))
+    except (TypeError, ValueError):
+        raise ValueError("reminder_id must be a number")
+    if reminder_id not in reminder_ids:
+        raise ValueError(f"reminder {reminder_id} doesn't belong to this user")
+
+    sent_at = str(row.get("sent_at") or "").strip()
+    action = str(row.get("action") or "").strip()
+    if not sent_at or not action:
+        raise ValueError("sent_at and action are required")
+    return reminder_id, sent_at, action, tenant
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors: List[Tuple[int, str]] = []
+
+    def reject(self, line_no: int, error: Exception) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line_no, str(error)))
+
+
+def _valid_rows(rows, validate, report: ImportReport, room: Optional[int] = None):
+    # room: how many more rows may be accepted, None for no limit
+    for line_no, row in rows:
+        try:
+            if room is not None and room <= 0:
+                raise ValueError("too many reminders, the rest of the file is skipped")
+            yield validate(row)
+            if room is not None:
+                room -= 1
+        except ValueError as e:
+            report.reject(line_no, e)
+
+
+def import_lines(
+    kind: str,
+    lines: Iterable[str],
+    fmt: str,
+    user_id: int,
+    tenant: str,
+    chunk_size: int = CHUNK_SIZE,
+    max_reminders: Optional[int] = None,
+) -> ImportReport:
+    """max_reminders caps how many reminders the user may end up with
+    (existing ones included); None means no cap, as for the CLI."""
+    report = ImportReport()
+    rows = load_rows(lines, fmt)
+
+    if kind == "reminders":
+        room = None
+        if max_reminders is not None:
+            room = max(0, max_reminders - len(get_reminder_ids(user_id, tenant)))
+        valid = _valid_rows(rows, validate_reminder, report, room)
+        write = lambda chunk: create_reminders_many(user_id, chunk, tenant)  # noqa: E731
+    else:
+        reminder_ids = get_reminder_ids(user_id, tenant)
+        valid = _valid_rows(rows, lambda r: validate_history(r, reminder_ids, tenant), report)
+        write = insert_history_many
+
+    while True:
+        chunk = list(islice(valid, chunk_size))
+        if not chunk:
+            break
+        write(chunk)
+        report.imported += len(chunk)
+    return report
+
+
+def import_file(path: str, kind: str, user_id: int, tenant: str,
+                fmt: Optional[str] = None,
+                max_reminders: Optional[int] = None) -> ImportReport:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return import_lines(kind, f, fmt or guess_format(path), user_id, tenant,
+                            max_reminders=max_reminders)
+
+
+# ---------- CLI ----------
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export")
+    exp.add_argument("kind", choices=KINDS)
+    exp.add_argument("--user", type=int, help="only this user (default: everyone)")
+    exp.add_argument("--tenant", help="only this bot (default: all of them)")
+    exp.add_argument("--format", choices=FORMATS, default="csv")
+    exp.add_argument("-o", "--output", help="file to write (default: stdout)")
+
+    imp = sub.add_parser("import")
+    imp.add_argument("kind", choices=KINDS)
+    imp.add_argument("path")
+    imp.add_argument("--user", type=int, required=True)
+    imp.add_argument("--tenant", default=DEFAULT_TENANT)
+    imp.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+
+    args = p.parse_args(argv)
+    init_db()
+
+    if args.command == "export":
+        if args.output:
+            count = export_to_file(args.output, args.kind, args.format, args.user, args.tenant)
+            print(f"exported {count} {args.kind}", file=sys.stderr)
+        else:
+            sys.stdout.writelines(export_lines(args.kind, args.format, args.user, args.tenant))
+        return 0
+
+    report = import_file(args.path, args.kind, args.user, args.tenant, args.format)
+    print(f"imported {report.imported}, rejected {report.rejected}", file=sys.stderr)
+    for line_no, error in report.errors:
+        print(f"  line {line_no}: {error}", file=sys.stderr)
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+# validators.py
+from datetime import datetime
+from typing import Optional
+
+
+def valid_time_str(t: str) -> bool:
+    try:
+        datetime.strptime(t, "%H:%M")
+        return True
+    except ValueError:
+        return False
+
+
+def parse_days(text: str):
+    """
+    Still used for /edit where you type days manually (англійською).
+    """
+    text = text.strip().lower()
+    if text == "daily":
+        return "daily"
+
+    mapping = {
+        "mon": 0, "monday": 0,
+        "tue": 1, "tuesday": 1,
+        "wed": 2, "wednesday": 2,
+        "thu": 3, "thursday": 3,
+        "fri": 4, "friday": 4,
+        "sat": 5, "saturday": 5,
+        "sun": 6, "sunday": 6,
+    }
+    parts = [p.strip() for p in text.replace(";", ",").split(",") if p.strip()]
+    numbers = []
+    for p in parts:
+        if p in mapping:
+            numbers.append(mapping[p])
+        else:
+            return None
+    if not numbers:
+        return None
+    return ",".join(sorted(set(str(n) for n in numbers), key=int))
+
+
+def normalize_days(text: str) -> Optional[str]:
+    """
+    Like parse_days, but also accepts the DB format ("0,2,4") that
+    exports are written in. Returns the DB format or None.
+    """
+    text = text.strip()
+    parts = [p.strip() for p in text.split(",") if p.strip()]
+    if parts and all(p.isdigit() for p in parts):
+        numbers = {int(p) for p in parts}
+        if not numbers <= set(range(7)):
+            return None
+        return ",".join(str(n) for n in sorted(numbers))
+    return parse_days(text)
+
+
+def normalize_time(t: str) -> Optional[str]:
+    """valid_time_str + zero padding, so "9:05" is stored as "09:05"."""
+    t = t.strip()
+    if not valid_time_str(t):
+        return None
+    return datetime.strptime(t, "%H:%M").strftime("%H:%M")